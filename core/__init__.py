@@ -1,11 +1,17 @@
 """Core module for Carbon Footprint Analyzer"""
 
-from .state import *
-from .config import *
-from .llm_factory import get_llm
+from .state import GraphState, Transaction, RedactedTransaction, CategorizedTransaction, CarbonEstimate, create_initial_state
+from .config import LANGSMITH_PROJECT, get_langsmith_config
 
 __all__ = [
-    'GraphState', 'Transaction', 'RedactedTransaction', 
-    'CategorizedTransaction', 'CarbonEstimate',
+    'GraphState', 'Transaction', 'RedactedTransaction',
+    'CategorizedTransaction', 'CarbonEstimate', 'create_initial_state',
     'get_llm', 'LANGSMITH_PROJECT', 'get_langsmith_config'
-]
\ No newline at end of file
+]
+
+def __getattr__(name):
+    # Import the LLM factory only when get_llm is first requested
+    if name == "get_llm":
+        from .llm_factory import get_llm
+        return get_llm
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
@@ -0,0 +1,62 @@
+"""Checkpointer for resumable workflow runs"""
+
+import math
+from langgraph.checkpoint.memory import MemorySaver
+from langgraph.checkpoint.serde.jsonplus import JsonPlusSerializer
+
+try:
+    import orjson  # Optional: faster encoding of the transaction lists in state
+except ImportError:
+    orjson = None
+
+# Datetimes, dataclasses and str subclasses would not come back as the same
+# type from JSON, so orjson hands them to the default serializer instead
+_ORJSON_OPTIONS = (
+    orjson.OPT_PASSTHROUGH_DATETIME
+    | orjson.OPT_PASSTHROUGH_DATACLASS
+    | orjson.OPT_PASSTHROUGH_SUBCLASS
+) if orjson is not None else 0
+
+def _all_finite(obj) -> bool:
+    """Whether a JSON-like value holds no NaN or infinity (orjson writes those as null)"""
+    pending = [obj]
+    while pending:
+        value = pending.pop()
+        if isinstance(value, dict):
+            pending.extend(value.values())
+        elif isinstance(value, (list, tuple)):
+            pending.extend(value)
+        elif isinstance(value, float) and not math.isfinite(value):
+            return False
+    return True
+
+class OrjsonSerializer(JsonPlusSerializer):
+    """Encode plain JSON state values with orjson, everything else (e.g. messages) as before"""
+    
+    def dumps_typed(self, obj):
+        # NaN and infinity would come back as None, so those values use the
+        # default serializer (state holds no tuples, which neither keeps)
+        if isinstance(obj, (dict, list)) and _all_finite(obj):
+            try:
+                return "orjson", orjson.dumps(obj, option=_ORJSON_OPTIONS)
+            except TypeError:
+                # Non-JSON values such as LangChain messages
+                pass
+        return super().dumps_typed(obj)
+    
+    def loads_typed(self, data):
+        type_, data_ = data
+        if type_ == "orjson":
+            return orjson.loads(data_)
+        return super().loads_typed(data)
+
+def create_checkpointer() -> MemorySaver:
+    """
+    Create the in-memory checkpointer used by resumable runs
+    
+    Returns:
+        MemorySaver using orjson for state values when it is installed
+    """
+    if orjson is None:
+        return MemorySaver()
+    return MemorySaver(serde=OrjsonSerializer())
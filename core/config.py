@@ -18,4 +18,22 @@ def get_langsmith_config():
 
 # Default models
 DEFAULT_OPENAI_MODEL = "gpt-4o"
-DEFAULT_GROQ_MODEL = "llama-3.3-70b-versatile"
\ No newline at end of file
+DEFAULT_GROQ_MODEL = "llama-3.3-70b-versatile"
+DEFAULT_ANTHROPIC_MODEL = "claude-3-5-haiku-20241022"
+
+# Client-side request pacing per provider model, for accounts with low rate limits (0 = unlimited)
+LLM_REQUESTS_PER_MINUTE = float(os.getenv("LLM_REQUESTS_PER_MINUTE", "0"))
+
+# PDF text extraction backend: "pymupdf" (default) or "pypdfium2" (optional, falls back to PyMuPDF)
+PDF_BACKEND = os.getenv("PDF_BACKEND", "pymupdf").lower()
+
+# Worker processes for text extraction of long PDFs (0 = extract in the calling process)
+PDF_WORKERS = int(os.getenv("PDF_WORKERS", "0"))
+
+# Reuse LLM-extracted transactions of a statement seen before (opt-in: the cache
+# holds unredacted statement lines on disk under .cache/extract)
+CACHE_EXTRACTIONS = os.getenv("CACHE_EXTRACTIONS", "false").lower() in ("1", "true", "yes")
+
+# Reuse the finished analysis of a statement seen before (opt-in: the cache
+# keeps redacted results on disk under .cache/results)
+CACHE_RESULTS = os.getenv("CACHE_RESULTS", "false").lower() in ("1", "true", "yes")
@@ -1,46 +1,130 @@
 """LLM factory for different providers"""
 
 import os
-from .config import DEFAULT_OPENAI_MODEL, DEFAULT_GROQ_MODEL
+import threading
+from .config import DEFAULT_OPENAI_MODEL, DEFAULT_GROQ_MODEL, DEFAULT_ANTHROPIC_MODEL, LLM_REQUESTS_PER_MINUTE
+
+# Provider API keys found in the environment
+_API_KEYS = {}
+
+def _api_key(name: str):
+    """
+    Read a provider API key from the environment
+    
+    Only keys that were found are remembered, so a key that is set later
+    (e.g. from .env or the UI) is still picked up.
+    """
+    key = _API_KEYS.get(name)
+    if key is None:
+        key = os.environ.get(name)
+        if key:
+            _API_KEYS[name] = key
+    return key
+
+# Configured clients keyed by (provider, model, temperature, max_tokens)
+_LLM_CACHE = {}
+
+# Request rate limiters keyed by (provider, model), shared by all clients of that model
+_RATE_LIMITERS = {}
+
+def _rate_limiter(provider: str, model: str):
+    """
+    Token bucket pacing requests to one provider model below LLM_REQUESTS_PER_MINUTE
+    
+    Returns:
+        Shared InMemoryRateLimiter, or None when no limit is configured
+    """
+    if LLM_REQUESTS_PER_MINUTE <= 0:
+        return None
+    limiter = _RATE_LIMITERS.get((provider, model))
+    if limiter is None:
+        from langchain_core.rate_limiters import InMemoryRateLimiter
+        
+        # Allow at most one second's worth of requests in a burst
+        requests_per_second = LLM_REQUESTS_PER_MINUTE / 60
+        limiter = _RATE_LIMITERS[(provider, model)] = InMemoryRateLimiter(
+            requests_per_second=requests_per_second,
+            max_bucket_size=max(1.0, requests_per_second)
+        )
+    return limiter
 
 def get_llm(provider: str = "openai", model: str = None, temperature: float = None, max_tokens: int = None):
     """
-    Initialize LLM with choice between Groq and OpenAI
+    Initialize LLM with choice between OpenAI, Groq and Anthropic
     
     Args:
-        provider: "openai" or "groq"
+        provider: "openai", "groq" or "anthropic"
         model: Specific model name (optional)
         temperature: Temperature for generation (optional, defaults per provider)
         max_tokens: Maximum tokens for generation (optional, defaults per provider)
     
     Returns:
-        Configured LLM instance
+        Configured LLM instance (shared across calls with the same configuration)
     """
-    if provider.lower() == "groq":
-        from langchain_groq import ChatGroq
-        
-        if not model:
-            model = DEFAULT_GROQ_MODEL
-        
-        return ChatGroq(
-            model=model,
-            temperature=temperature if temperature is not None else 0.1,
-            max_tokens=max_tokens if max_tokens is not None else 4096,
-            groq_api_key=os.getenv("GROQ_API_KEY")
-        )
+    key = (provider.lower(), model, temperature, max_tokens)
+    llm = _LLM_CACHE.get(key)
+    if llm is None:
+        factory = _PROVIDERS.get(key[0])
+        if factory is None:
+            raise ValueError(f"Unsupported provider: {provider}. Choose 'openai', 'groq' or 'anthropic'")
+        llm = _LLM_CACHE[key] = factory(model, temperature, max_tokens)
+    return llm
+
+def prewarm_llm(provider: str = "openai", model: str = None, temperature: float = None, max_tokens: int = None) -> None:
+    """
+    Create an LLM client on a background thread
     
-    elif provider.lower() == "openai":
-        from langchain_openai import ChatOpenAI
-        
-        if not model:
-            model = DEFAULT_OPENAI_MODEL
-        
-        return ChatOpenAI(
-            model=model,
-            temperature=temperature if temperature is not None else 0.1,
-            max_tokens=max_tokens if max_tokens is not None else 4096,
-            api_key=os.getenv("OPENAI_API_KEY")
-        )
+    The provider package import and client setup then overlap with other work
+    (e.g. PDF parsing) instead of delaying the node that first needs the client.
+    Takes the same arguments as get_llm; failures are left for that node to report.
+    """
+    def warm():
+        try:
+            get_llm(provider, model, temperature, max_tokens)
+        except Exception:
+            pass
     
-    else:
-        raise ValueError(f"Unsupported provider: {provider}. Choose 'openai' or 'groq'")
+    threading.Thread(target=warm, name=f"prewarm-{provider}", daemon=True).start()
+
+def _create_groq(model: str, temperature: float, max_tokens: int):
+    from langchain_groq import ChatGroq
+    
+    model = model or DEFAULT_GROQ_MODEL
+    return ChatGroq(
+        model=model,
+        temperature=temperature if temperature is not None else 0.1,
+        max_tokens=max_tokens if max_tokens is not None else 4096,
+        groq_api_key=_api_key("GROQ_API_KEY"),
+        rate_limiter=_rate_limiter("groq", model)
+    )
+
+def _create_openai(model: str, temperature: float, max_tokens: int):
+    from langchain_openai import ChatOpenAI
+    
+    model = model or DEFAULT_OPENAI_MODEL
+    return ChatOpenAI(
+        model=model,
+        temperature=temperature if temperature is not None else 0.1,
+        max_tokens=max_tokens if max_tokens is not None else 4096,
+        api_key=_api_key("OPENAI_API_KEY"),
+        rate_limiter=_rate_limiter("openai", model)
+    )
+
+def _create_anthropic(model: str, temperature: float, max_tokens: int):
+    from langchain_anthropic import ChatAnthropic
+    
+    model = model or DEFAULT_ANTHROPIC_MODEL
+    return ChatAnthropic(
+        model=model,
+        temperature=temperature if temperature is not None else 0.1,
+        max_tokens=max_tokens if max_tokens is not None else 4096,
+        api_key=_api_key("ANTHROPIC_API_KEY"),
+        rate_limiter=_rate_limiter("anthropic", model)
+    )
+
+# Provider name -> client factory (provider packages are imported on first use)
+_PROVIDERS = {
+    "groq": _create_groq,
+    "openai": _create_openai,
+    "anthropic": _create_anthropic,
+}
@@ -2,6 +2,7 @@
 
 from typing import TypedDict, Annotated, Sequence, Literal
 from langchain_core.messages import BaseMessage
+from langgraph.graph.message import add_messages
 
 class Transaction(TypedDict):
     """Individual transaction from bank statement"""
@@ -44,12 +45,13 @@ class CarbonEstimate(TypedDict):
     emission_factor_max: float
     notes: str
 
-class GraphState(TypedDict):
-    """Main state for the LangGraph workflow"""
+class GraphState(TypedDict, total=False):
+    """Main state for the LangGraph workflow (fields are absent until a node sets them)"""
     # Input
     pdf_path: str
     pdf_password: str
-    raw_text: str
+    pdf_bytes: bytes  # In-memory statement (instead of pdf_path); cleared by parse_pdf once parsed
+    raw_text: str  # Cleared by extract_transactions once it has been used
     
     # LLM Configuration
     llm_provider: str  # "anthropic" or "groq"
@@ -74,11 +76,16 @@ class GraphState(TypedDict):
     total_carbon_kg_avg: float
     category_breakdown: dict
     monthly_breakdown: dict
+    sorted_categories: list[list]  # [category, totals] pairs from category_breakdown, highest emissions first
+    processing_summary: dict
     
     # Categorization & Redaction stats
     rule_based_count: int
     llm_based_count: int
+    merchant_cache_hits: int  # LLM-path transactions answered from the merchant cache
     pii_redacted_count: int
+    credits_filtered_count: int  # Credits dropped by redact_pii (only debits are analyzed)
+    debits_processed_count: int
     
     # High-value transaction tracking (moved earlier in pipeline)
     high_value_transactions: list[dict]  # Transactions ≥₹50,000 (excluded from analysis)
@@ -87,7 +94,30 @@ class GraphState(TypedDict):
     # Processing metadata
     recommendations: list[str]
     insights: list[str]
-    messages: list
+    messages: Annotated[list, add_messages]  # Merged by message id, so parallel nodes can both append
     errors: list[str]
     processing_status: str
+    
+    # Result cache (set when a PDF statement is analyzed)
+    result_cache_key: str   # Content hash of the statement and analysis settings
+    result_cache_hit: bool  # True when the result was loaded instead of computed
 
+def create_initial_state(pdf_path: str = "", pdf_password: str = "",
+                         llm_provider: str = "openai", llm_model: str = "",
+                         pdf_bytes: bytes = b"") -> GraphState:
+    """
+    Build the initial workflow state; besides the user-provided fields only
+    errors and llm_based_count, which consumers read directly, start set and
+    every other field is left for the nodes to set
+    """
+    state = {
+        "pdf_path": pdf_path,
+        "pdf_password": pdf_password,
+        "llm_provider": llm_provider,
+        "llm_model": llm_model,
+        "errors": [],
+        "llm_based_count": 0
+    }
+    if pdf_bytes:
+        state["pdf_bytes"] = pdf_bytes
+    return state
@@ -1,23 +1,31 @@
 """Node functions for LangGraph workflow"""
 
-from .pdf_parser import parse_pdf_node
-from .transaction_extractor import extract_transactions_node
-from .pii_redactor import redact_pii_node
-from .high_value_filter import filter_high_value_node
-from .rule_categorizer import rule_based_categorization_node
-from .llm_categorizer import llm_categorization_node
-from .carbon_estimator import estimate_carbon_node
-from .aggregator import aggregate_results_node
-from .insights_generator import generate_insights_node
+import importlib
 
-__all__ = [
-    'parse_pdf_node',
-    'extract_transactions_node', 
-    'redact_pii_node',
-    'filter_high_value_node',
-    'rule_based_categorization_node',
-    'llm_categorization_node',
-    'estimate_carbon_node',
-    'aggregate_results_node',
-    'generate_insights_node'
-]
+# Node function -> submodule defining it (imported on first access)
+_NODE_MODULES = {
+    'check_result_cache_node': '.result_cache',
+    'parse_pdf_node': '.pdf_parser',
+    'extract_transactions_node': '.transaction_extractor',
+    'redact_pii_node': '.pii_redactor',
+    'filter_high_value_node': '.high_value_filter',
+    'rule_based_categorization_node': '.rule_categorizer',
+    'llm_categorization_node': '.llm_categorizer',
+    'estimate_carbon_node': '.carbon_estimator',
+    'aggregate_results_node': '.aggregator',
+    'generate_insights_node': '.insights_generator',
+    'store_result_node': '.result_cache'
+}
+
+__all__ = list(_NODE_MODULES)
+
+def __getattr__(name):
+    module_name = _NODE_MODULES.get(name)
+    if module_name is None:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    node = getattr(importlib.import_module(module_name, __name__), name)
+    globals()[name] = node
+    return node
+
+def __dir__():
+    return sorted(list(globals()) + __all__)
@@ -1,71 +1,149 @@
 """Node 6: Carbon Footprint Estimation"""
 
+import re
+import numpy as np
 from langchain_core.messages import AIMessage
 from core.state import GraphState
-from utils.patterns import get_emission_factor, normalize_category
+from utils.patterns import get_emission_factor, normalize_category, NORMALIZED_CATEGORIES
 
-def estimate_carbon_node(state: GraphState) -> GraphState:
+# Statement dates arrive as ISO (sample data) or DD/MM/YYYY or DD/MM/YY (LLM extraction)
+_ISO_DATE_RE = re.compile(r'^(\d{4})-(\d{1,2})-\d{1,2}')
+_DMY_DATE_RE = re.compile(r'^\d{1,2}[/-](\d{1,2})[/-](\d{4}|\d{2})(?!\d)')
+
+def _full_year(year: str) -> str:
+    """Four-digit year; two-digit years pivot like strptime's %y (69-99 → 19xx, else 20xx)"""
+    if len(year) == 4:
+        return year
+    return f"{19 if int(year) >= 69 else 20}{year}"
+
+def _month_key(date: str) -> str:
+    """Return the YYYY-MM month of a transaction date, or "unknown" if it can't be read"""
+    match = _ISO_DATE_RE.match(date)
+    if match:
+        return f"{match.group(1)}-{int(match.group(2)):02d}"
+    match = _DMY_DATE_RE.match(date)
+    if match:
+        return f"{_full_year(match.group(2))}-{int(match.group(1)):02d}"
+    return "unknown"
+
+def estimate_carbon_node(state: GraphState) -> dict:
     """
     Node 6: Calculate carbon footprint for categorized transactions
     High-value transactions already filtered out in Node 3
     """
-    carbon_estimates = []
-    total_carbon_min = 0
-    total_carbon_max = 0
-    total_carbon_avg = 0
+    carbon_estimates = state.get("categorized_transactions", [])
     
-    for transaction in state.get("categorized_transactions", []):
-        category = transaction.get("category", "miscellaneous")
-        # Normalize category to ensure it's in official list
-        category = normalize_category(category)
+    amounts = []
+    category_ids = []
+    category_index = {}
+    month_ids = []
+    month_index = {}
+    month_by_date = {}
+    for transaction in carbon_estimates:
+        # Category is always set by the rule-based or LLM categorizer;
+        # normalize it to ensure it's in official list
+        category = transaction["category"]
+        category = NORMALIZED_CATEGORIES.get(category) or normalize_category(category)
         
         # Handle both nested and flat transaction structures
-        if "transaction" in transaction:
-            amount = transaction["transaction"].get("amount", 0)
-            description = transaction["transaction"].get("description", "")
-        else:
-            amount = transaction.get("amount", 0)
-            description = transaction.get("description", "")
-        
-        # Get emission factor for category
-        emission_factor = get_emission_factor(category)
+        # (amount is guaranteed by extraction / sample data)
+        record = transaction["transaction"] if "transaction" in transaction else transaction
+        amounts.append(record["amount"])
+        category_ids.append(category_index.setdefault(category, len(category_index)))
         
-        # Calculate carbon footprint (amount in thousands of rupees)
-        amount_thousands = amount / 1000
-        carbon_min = amount_thousands * emission_factor["min"]
-        carbon_max = amount_thousands * emission_factor["max"]
-        carbon_avg = (carbon_min + carbon_max) / 2
-        
-        # Create carbon estimate (no high-value checks needed)
-        carbon_estimate = {
-            **transaction,
-            "carbon_kg_min": round(carbon_min, 2),
-            "carbon_kg_max": round(carbon_max, 2),
-            "carbon_kg_avg": round(carbon_avg, 2),
+        # Months are resolved once per distinct date string
+        date = str(record.get("date") or "")
+        month = month_by_date.get(date)
+        if month is None:
+            month = month_by_date[date] = _month_key(date.strip())
+        month_ids.append(month_index.setdefault(month, len(month_index)))
+    
+    # Emission factors are looked up once per category, then gathered per row
+    category_factors = [get_emission_factor(category) for category in category_index]
+    factor_min = np.array([f["min"] for f in category_factors], dtype=np.float64)
+    factor_max = np.array([f["max"] for f in category_factors], dtype=np.float64)
+    category_ids = np.asarray(category_ids, dtype=np.intp)
+    
+    # Calculate carbon footprint for all rows at once (amount in thousands of rupees)
+    amounts = np.asarray(amounts, dtype=np.float64)
+    amount_thousands = amounts / 1000
+    carbon_min = amount_thousands * factor_min[category_ids]
+    carbon_max = amount_thousands * factor_max[category_ids]
+    carbon_avg = (carbon_min + carbon_max) / 2
+    
+    kg_min_rounded = np.round(carbon_min, 2)
+    kg_max_rounded = np.round(carbon_max, 2)
+    kg_avg_rounded = np.round(carbon_avg, 2)
+    
+    # Attach carbon estimates to the transactions (no high-value checks needed)
+    rows = zip(
+        carbon_estimates, category_ids.tolist(),
+        kg_min_rounded.tolist(),
+        kg_max_rounded.tolist(),
+        kg_avg_rounded.tolist()
+    )
+    for transaction, category_id, kg_min, kg_max, kg_avg in rows:
+        emission_factor = category_factors[category_id]
+        transaction["carbon_kg_min"] = kg_min
+        transaction["carbon_kg_max"] = kg_max
+        transaction["carbon_kg_avg"] = kg_avg
+        transaction["emission_factor_min"] = emission_factor["min"]
+        transaction["emission_factor_max"] = emission_factor["max"]
+        transaction["emission_factor_notes"] = emission_factor.get("notes", "")
+    
+    # Accumulate per-category totals in the same pass so the aggregator
+    # does not need to re-scan every estimate
+    n_categories = len(category_index)
+    category_sums = {
+        key: np.bincount(category_ids, weights=values, minlength=n_categories).tolist()
+        for key, values in (
+            ("min", kg_min_rounded),
+            ("max", kg_max_rounded),
+            ("avg", kg_avg_rounded),
+            ("amount_spent", amounts)
+        )
+    }
+    category_counts = np.bincount(category_ids, minlength=n_categories).tolist()
+    
+    category_breakdown = {}
+    for category, i in category_index.items():
+        emission_factor = category_factors[i]
+        category_breakdown[category] = {
+            "min": category_sums["min"][i],
+            "max": category_sums["max"][i],
+            "avg": category_sums["avg"][i],
+            "amount_spent": category_sums["amount_spent"][i],
             "emission_factor_min": emission_factor["min"],
             "emission_factor_max": emission_factor["max"],
-            "emission_factor_notes": emission_factor.get("notes", "")
+            "count": category_counts[i]
         }
-        
-        carbon_estimates.append(carbon_estimate)
-        
-        # Add to totals
-        total_carbon_min += carbon_min
-        total_carbon_max += carbon_max
-        total_carbon_avg += carbon_avg
     
-    state["carbon_estimates"] = carbon_estimates
-    state["total_carbon_kg_min"] = round(total_carbon_min, 2)
-    state["total_carbon_kg_max"] = round(total_carbon_max, 2)
-    state["total_carbon_kg_avg"] = round(total_carbon_avg, 2)
+    # Monthly totals use the same grouped sums, keyed by YYYY-MM
+    month_ids = np.asarray(month_ids, dtype=np.intp)
+    n_months = len(month_index)
+    month_carbon = np.bincount(month_ids, weights=kg_avg_rounded, minlength=n_months).tolist()
+    month_spent = np.bincount(month_ids, weights=amounts, minlength=n_months).tolist()
+    month_counts = np.bincount(month_ids, minlength=n_months).tolist()
     
-    # Build messages
-    messages = [
-        AIMessage(content=f"✅ Carbon footprint calculated for {len(carbon_estimates)} transactions"),
-        AIMessage(content=f"📊 Total estimated emissions: {round(total_carbon_avg, 1)} kg CO2e")
-    ]
+    monthly_breakdown = {}
+    for month, i in sorted(month_index.items()):
+        monthly_breakdown[month] = {
+            "total_carbon": month_carbon[i],
+            "amount_spent": month_spent[i],
+            "count": month_counts[i]
+        }
     
-    state["messages"] = state.get("messages", []) + messages
+    total_carbon_avg = float(carbon_avg.sum())
     
-    return state
-
+    return {
+        "carbon_estimates": carbon_estimates,
+        "category_breakdown": category_breakdown,
+        "monthly_breakdown": monthly_breakdown,
+        "total_carbon_kg_min": round(float(carbon_min.sum()), 2),
+        "total_carbon_kg_max": round(float(carbon_max.sum()), 2),
+        "total_carbon_kg_avg": round(total_carbon_avg, 2),
+        "messages": [
+            AIMessage(content=f"✅ Carbon footprint calculated for {len(carbon_estimates)} transactions"),
+            AIMessage(content=f"📊 Total estimated emissions: {round(total_carbon_avg, 1)} kg CO2e")
+        ]
+    }
@@ -1,46 +1,47 @@
 """Node 3: High-Value Transaction Filter"""
 
+import numpy as np
 from langchain_core.messages import AIMessage
 from core.state import GraphState
 
 # Threshold for high-value transactions that need activity-based estimation
 HIGH_VALUE_THRESHOLD = 50000  # ₹50,000
 
-def filter_high_value_node(state: GraphState) -> GraphState:
+def filter_high_value_node(state: GraphState) -> dict:
     """
     Node 3: Filter out high-value transactions before categorization
     High-value transactions (≥₹50,000) are excluded from spend-based carbon estimation
     """
     redacted_transactions = state.get("redacted_transactions", [])
     
-    regular_transactions = []
-    high_value_transactions = []
+    amounts = np.fromiter(
+        (transaction.get("amount", 0) for transaction in redacted_transactions),
+        dtype=np.float64,
+        count=len(redacted_transactions)
+    )
+    high_value_mask = amounts >= HIGH_VALUE_THRESHOLD
     
-    for transaction in redacted_transactions:
-        amount = transaction.get("amount", 0)
-        description = transaction.get("description", "")
-        
-        if amount >= HIGH_VALUE_THRESHOLD:
-            # Flag as high-value, exclude from carbon estimation
-            high_value_txn = {
-                "amount": amount,
-                "description": description[:50] + "..." if len(description) > 50 else description,
-                "date": transaction.get("date", ""),
-                "full_transaction": transaction,
-                "reason": "High-value transaction - spend-based estimation not accurate"
-            }
-            high_value_transactions.append(high_value_txn)
-        else:
-            # Regular transaction - proceed with categorization
-            regular_transactions.append(transaction)
+    # Regular transactions - proceed with categorization
+    regular_transactions = [
+        redacted_transactions[i] for i in np.flatnonzero(~high_value_mask)
+    ]
     
-    # Update state
-    state["filtered_transactions"] = regular_transactions
-    state["high_value_transactions"] = high_value_transactions
-    state["high_value_count"] = len(high_value_transactions)
+    # Flag high-value transactions, exclude from carbon estimation
+    high_value_transactions = []
+    for i in np.flatnonzero(high_value_mask):
+        transaction = redacted_transactions[i]
+        description = transaction.get("description", "")
+        high_value_txn = {
+            "amount": transaction.get("amount", 0),
+            "description": description[:50] + "..." if len(description) > 50 else description,
+            "date": transaction.get("date", ""),
+            "full_transaction": transaction,
+            "reason": "High-value transaction - spend-based estimation not accurate"
+        }
+        high_value_transactions.append(high_value_txn)
     
     # Calculate total high-value amount
-    total_high_value = sum(txn["amount"] for txn in high_value_transactions)
+    total_high_value = float(amounts[high_value_mask].sum())
     
     # Build messages
     messages = [
@@ -57,6 +58,10 @@ def filter_high_value_node(state: GraphState) -> GraphState:
             ))
         )
     
-    state["messages"] = state.get("messages", []) + messages
-    
-    return state
+    # Runs in parallel with rule-based categorization, so only this node's keys are returned
+    return {
+        "filtered_transactions": regular_transactions,
+        "high_value_transactions": high_value_transactions,
+        "high_value_count": len(high_value_transactions),
+        "messages": messages
+    }
@@ -3,7 +3,43 @@
 from langchain_core.messages import AIMessage
 from core.state import GraphState
 
-def generate_insights_node(state: GraphState) -> GraphState:
+_TRANSPORT_CATEGORIES = frozenset({"transport_ride_sharing", "transport_fuel", "transport_public"})
+
+# Category -> (minimum kg CO2e before recommending, recommendation template)
+_RECOMMENDATION_RULES = {
+    "transport_ride_sharing": (
+        5,
+        "🚌 Switch to metro/public transport to reduce ride-sharing emissions by 30% "
+        "(currently {kg:.1f} kg CO2e from {count} trips)"
+    ),
+    "food_delivery": (
+        3,
+        "🍳 Consider meal planning to reduce food delivery frequency by 25% "
+        "(currently {kg:.1f} kg CO2e from {count} orders)"
+    ),
+    "transport_fuel": (
+        10,
+        "🚗 Consider carpooling or electric vehicle to reduce fuel emissions by 40% "
+        "(currently {kg:.1f} kg CO2e from fuel purchases)"
+    ),
+    "housing_utilities": (
+        8,
+        "💡 Use energy-efficient appliances to lower utility emissions by 15% "
+        "(currently {kg:.1f} kg CO2e from utilities)"
+    ),
+    "shopping_online": (
+        5,
+        "📦 Buy local products when possible to reduce shopping emissions by 10% "
+        "(currently {kg:.1f} kg CO2e from {count} purchases)"
+    ),
+    "food_groceries": (
+        4,
+        "🥬 Choose local/seasonal produce to reduce grocery emissions by 20% "
+        "(currently {kg:.1f} kg CO2e from groceries)"
+    ),
+}
+
+def generate_insights_node(state: GraphState) -> dict:
     """
     Node 8: Generate actionable insights and recommendations
     """
@@ -23,41 +59,9 @@ def generate_insights_node(state: GraphState) -> GraphState:
         if carbon_kg < 1:
             continue  # Skip very low emission categories
         
-        if category == "transport_ride_sharing" and carbon_kg > 5:
-            recommendations.append(
-                f"🚌 Switch to metro/public transport to reduce ride-sharing emissions by 30% "
-                f"(currently {carbon_kg:.1f} kg CO2e from {count} trips)"
-            )
-        
-        elif category == "food_delivery" and carbon_kg > 3:
-            recommendations.append(
-                f"🍳 Consider meal planning to reduce food delivery frequency by 25% "
-                f"(currently {carbon_kg:.1f} kg CO2e from {count} orders)"
-            )
-        
-        elif category == "transport_fuel" and carbon_kg > 10:
-            recommendations.append(
-                f"🚗 Consider carpooling or electric vehicle to reduce fuel emissions by 40% "
-                f"(currently {carbon_kg:.1f} kg CO2e from fuel purchases)"
-            )
-        
-        elif category == "housing_utilities" and carbon_kg > 8:
-            recommendations.append(
-                f"💡 Use energy-efficient appliances to lower utility emissions by 15% "
-                f"(currently {carbon_kg:.1f} kg CO2e from utilities)"
-            )
-        
-        elif category == "shopping_online" and carbon_kg > 5:
-            recommendations.append(
-                f"📦 Buy local products when possible to reduce shopping emissions by 10% "
-                f"(currently {carbon_kg:.1f} kg CO2e from {count} purchases)"
-            )
-        
-        elif category == "food_groceries" and carbon_kg > 4:
-            recommendations.append(
-                f"🥬 Choose local/seasonal produce to reduce grocery emissions by 20% "
-                f"(currently {carbon_kg:.1f} kg CO2e from groceries)"
-            )
+        rule = _RECOMMENDATION_RULES.get(category)
+        if rule and carbon_kg > rule[0]:
+            recommendations.append(rule[1].format(kg=carbon_kg, count=count))
     
     # Generate general insights
     if total_carbon > 50:
@@ -79,10 +83,9 @@ def generate_insights_node(state: GraphState) -> GraphState:
             )
     
     # Transport vs other categories
-    transport_categories = ["transport_ride_sharing", "transport_fuel", "transport_public"]
     transport_total = sum(
         data["avg"] for cat, data in category_breakdown.items() 
-        if cat in transport_categories
+        if cat in _TRANSPORT_CATEGORIES
     )
     
     if transport_total > total_carbon * 0.5:
@@ -102,13 +105,12 @@ def generate_insights_node(state: GraphState) -> GraphState:
     # Limit recommendations to top 4
     recommendations = recommendations[:4]
     
-    state["recommendations"] = recommendations
-    state["insights"] = insights
-    
-    state["messages"] = state.get("messages", []) + [
-        AIMessage(content=f"✅ Generated {len(insights)} insights and {len(recommendations)} recommendations"),
-        AIMessage(content="🎯 Analysis complete! Check your personalized carbon footprint report.")
-    ]
-    
-    return state
+    return {
+        "recommendations": recommendations,
+        "insights": insights,
+        "messages": [
+            AIMessage(content=f"✅ Generated {len(insights)} insights and {len(recommendations)} recommendations"),
+            AIMessage(content="🎯 Analysis complete! Check your personalized carbon footprint report.")
+        ]
+    }
 
@@ -1,24 +1,95 @@
 """Node 5: LLM-based Categorization"""
 
-import json
-import re
+from typing import List
+from pydantic import BaseModel, Field
 from langchain_core.messages import AIMessage
 from langchain_core.prompts import ChatPromptTemplate
+from langchain_core.runnables import RunnableConfig
 from core.state import GraphState
 from core.llm_factory import get_llm
+from utils.merchant_cache import normalize_merchant
 from utils.patterns import get_all_categories, normalize_category
 
-def llm_categorization_node(state: GraphState) -> GraphState:
+# Maximum number of transactions sent to the LLM in a single prompt
+LLM_BATCH_SIZE = 50
+
+# Maximum number of batch prompts in flight at once (overridable per run)
+LLM_MAX_CONCURRENCY = 8
+
+# Attempts per batch prompt (with exponential backoff) before falling back
+LLM_MAX_ATTEMPTS = 3
+
+class TransactionCategory(BaseModel):
+    """Category assigned to a single transaction"""
+    index: int = Field(description="Index of the transaction in the input list")
+    category: str = Field(description="One of the allowed category names")
+
+class CategorizationResult(BaseModel):
+    """Categories for a batch of transactions"""
+    categorizations: List[TransactionCategory]
+
+# Categories list is static, so the prompt is built once at import
+_CATEGORIES_TEXT = "\n".join(f"- {cat}" for cat in get_all_categories())
+
+# Categorization prompt with strict category enforcement
+_PROMPT = ChatPromptTemplate.from_messages([
+    ("system", f"""You are a transaction categorizer for carbon footprint analysis.
+
+You MUST use ONLY these exact categories (no others allowed):
+{_CATEGORIES_TEXT}
+
+For each transaction, assign the most appropriate category based on the merchant/description.
+Return one entry per transaction with its index and category.
+
+IMPORTANT: 
+- Use ONLY the exact category names listed above
+- Use "miscellaneous" if no category fits well
+- Do NOT create new categories or variations"""),
+    ("human", "Transactions to categorize:\n{transactions}")
+])
+
+def llm_categorization_node(state: GraphState, config: RunnableConfig = None) -> dict:
     """
     Node 5: Use LLM to categorize remaining transactions
     """
+    rule_categorized = state.get("rule_categorized", [])
     uncategorized = state.get("uncategorized", [])
     
     if not uncategorized:
-        state["messages"] = state.get("messages", []) + [
-            AIMessage(content="✅ No transactions need LLM categorization")
-        ]
-        return state
+        return {
+            "categorized_transactions": rule_categorized,
+            "llm_based_count": 0,
+            "messages": [AIMessage(content="✅ No transactions need LLM categorization")]
+        }
+    
+    # Reuse categories the LLM assigned to the same merchants in earlier runs;
+    # only cache misses are sent to the LLM
+    configurable = (config or {}).get("configurable", {})
+    merchant_cache = configurable.get("merchant_cache")
+    cached_categorized = []
+    if merchant_cache is not None:
+        merchant_keys = [normalize_merchant(txn.get("description", "")) for txn in uncategorized]
+        cached_categories = merchant_cache.get_many(merchant_keys)
+        pending = []
+        for txn, merchant in zip(uncategorized, merchant_keys):
+            category = cached_categories.get(merchant)
+            if category is None:
+                pending.append(txn)
+                continue
+            txn["category"] = category
+            txn["categorization_method"] = "llm_based"
+            cached_categorized.append(txn)
+        uncategorized = pending
+    
+    if not uncategorized:
+        return {
+            "categorized_transactions": rule_categorized + cached_categorized,
+            "llm_based_count": len(cached_categorized),
+            "merchant_cache_hits": len(cached_categorized),
+            "messages": [AIMessage(
+                content=f"✅ LLM categorization: {len(cached_categorized)} transactions (all from merchant cache)"
+            )]
+        }
     
     # Get LLM
     llm = get_llm(
@@ -26,98 +97,113 @@ def llm_categorization_node(state: GraphState) -> GraphState:
         model=state.get("llm_model", "claude-3-5-haiku-20241022")
     )
     
-    # Prepare categories list
-    categories = get_all_categories()
-    categories_text = "\n".join([f"- {cat}" for cat in categories])
-    
-    # Create categorization prompt with strict category enforcement
-    prompt = ChatPromptTemplate.from_messages([
-        ("system", f"""You are a transaction categorizer for carbon footprint analysis.
-
-You MUST use ONLY these exact categories (no others allowed):
-{categories_text}
-
-For each transaction, assign the most appropriate category based on the merchant/description.
-Return JSON array with format: [{{{{"index": 0, "category": "category_name"}}}}]
-
-IMPORTANT: 
-- Use ONLY the exact category names listed above
-- Use "miscellaneous" if no category fits well
-- Do NOT create new categories or variations"""),
-        ("human", "Transactions to categorize:\n{transactions}")
-    ])
-    
     try:
-        # Format transactions for LLM
-        transactions_text = ""
-        for i, txn in enumerate(uncategorized):
-            transactions_text += f"{i}: {txn.get('description', '')} - ₹{txn.get('amount', 0)}\n"
+        # Transactions from the same merchant share a single prompt line
+        merchant_groups = {}
+        for txn in uncategorized:
+            description = txn.get("description", "")
+            merchant_groups.setdefault(normalize_merchant(description) or description, []).append(txn)
+        groups = list(merchant_groups.values())
+        
+        # Split into fixed-size batches so each prompt stays well within context limits
+        batches = [
+            groups[start:start + LLM_BATCH_SIZE]
+            for start in range(0, len(groups), LLM_BATCH_SIZE)
+        ]
         
-        chain = prompt | llm
-        result = chain.invoke(
-            {"transactions": transactions_text},
+        # Format one transaction per merchant for LLM (indices are local to each batch)
+        batch_inputs = [
+            {"transactions": "".join(
+                f"{i}: {group[0].get('description', '')} - ₹{group[0].get('amount', 0)}\n"
+                for i, group in enumerate(batch)
+            )}
+            for batch in batches
+        ]
+        
+        # Batches are sent concurrently, a bounded number at a time; a failed batch
+        # (rate limit, unparseable response) is retried on its own
+        chain = (_PROMPT | llm.with_structured_output(CategorizationResult)).with_retry(
+            wait_exponential_jitter=True,
+            stop_after_attempt=LLM_MAX_ATTEMPTS
+        )
+        results = chain.batch(
+            batch_inputs,
             config={
                 "run_name": "llm_categorization",
-                "tags": ["categorization", state.get("llm_provider", "anthropic")]
-            }
+                "tags": ["categorization", state.get("llm_provider", "anthropic")],
+                "max_concurrency": configurable.get("max_concurrency") or LLM_MAX_CONCURRENCY
+            },
+            return_exceptions=True
         )
         
-        # Parse LLM response
-        response_text = result.content if hasattr(result, 'content') else str(result)
-        
-        # Extract JSON from response
-        json_match = re.search(r'\[.*?\]', response_text, re.DOTALL)
-        
-        if json_match:
-            categorizations = json.loads(json_match.group())
+        # Apply categorizations with normalization; a batch that still failed after
+        # its retries falls back on its own, the other batches keep their categories
+        llm_categorized = []
+        fallback_categorized = []
+        batch_errors = []
+        for batch, result in zip(batches, results):
+            if result is None or isinstance(result, Exception):
+                batch_errors.append(str(result) if result is not None else "LLM response did not contain categorizations")
+                for group in batch:
+                    for txn in group:
+                        txn["category"] = "miscellaneous"
+                        txn["categorization_method"] = "fallback"
+                        fallback_categorized.append(txn)
+                continue
             
-            # Apply categorizations with normalization
-            llm_categorized = []
-            for cat_result in categorizations:
-                idx = cat_result.get("index", 0)
-                category = cat_result.get("category", "miscellaneous")
+            for cat_result in result.categorizations:
+                idx = cat_result.index
                 
                 # Normalize category to official list
-                category = normalize_category(category)
+                category = normalize_category(cat_result.category)
                 
-                if 0 <= idx < len(uncategorized):
-                    categorized_txn = {
-                        **uncategorized[idx],
-                        "category": category,
-                        "categorization_method": "llm_based"
-                    }
-                    llm_categorized.append(categorized_txn)
-            
-            # Combine with rule-based categorizations
-            all_categorized = state.get("rule_categorized", []) + llm_categorized
-            state["categorized_transactions"] = all_categorized
-            state["llm_based_count"] = len(llm_categorized)
-            
-            state["messages"] = state.get("messages", []) + [
-                AIMessage(content=f"✅ LLM categorization: {len(llm_categorized)} transactions")
-            ]
-        else:
-            raise ValueError("LLM response did not contain valid JSON")
-            
+                if 0 <= idx < len(batch):
+                    for categorized_txn in batch[idx]:
+                        categorized_txn["category"] = category
+                        categorized_txn["categorization_method"] = "llm_based"
+                        llm_categorized.append(categorized_txn)
+        
+        # Remember the new merchant categories for later runs
+        if merchant_cache is not None:
+            merchant_cache.set_many({
+                normalize_merchant(txn.get("description", "")): txn["category"]
+                for txn in llm_categorized
+            })
+        
+        # Combine with rule-based, cached and fallback categorizations
+        llm_based_count = len(cached_categorized) + len(llm_categorized) + len(fallback_categorized)
+        cache_note = f" ({len(cached_categorized)} from merchant cache)" if cached_categorized else ""
+        update = {
+            "categorized_transactions": rule_categorized + cached_categorized + llm_categorized + fallback_categorized,
+            "llm_based_count": llm_based_count,
+            "merchant_cache_hits": len(cached_categorized),
+            "messages": [AIMessage(content=f"✅ LLM categorization: {llm_based_count} transactions{cache_note}")]
+        }
+        
+        if batch_errors:
+            error_msg = (
+                f"LLM categorization error in {len(batch_errors)} of {len(batches)} batches: {batch_errors[0]}"
+            )
+            update["errors"] = state.get("errors", []) + [error_msg]
+            update["messages"].append(AIMessage(
+                content=f"⚠️ {len(fallback_categorized)} transactions used the fallback category. Error: {batch_errors[0]}"
+            ))
+    
     except Exception as e:
         # Fallback: categorize as miscellaneous
         fallback_categorized = []
         for txn in uncategorized:
-            fallback_txn = {
-                **txn,
-                "category": "miscellaneous",
-                "categorization_method": "fallback"
-            }
-            fallback_categorized.append(fallback_txn)
-        
-        all_categorized = state.get("rule_categorized", []) + fallback_categorized
-        state["categorized_transactions"] = all_categorized
-        state["llm_based_count"] = len(fallback_categorized)
+            txn["category"] = "miscellaneous"
+            txn["categorization_method"] = "fallback"
+            fallback_categorized.append(txn)
         
         error_msg = f"LLM categorization error: {str(e)}"
-        state["errors"] = state.get("errors", []) + [error_msg]
-        state["messages"] = state.get("messages", []) + [
-            AIMessage(content=f"⚠️ LLM categorization failed, using fallback. Error: {str(e)}")
-        ]
+        update = {
+            "categorized_transactions": rule_categorized + cached_categorized + fallback_categorized,
+            "llm_based_count": len(cached_categorized) + len(fallback_categorized),
+            "merchant_cache_hits": len(cached_categorized),
+            "errors": state.get("errors", []) + [error_msg],
+            "messages": [AIMessage(content=f"⚠️ LLM categorization failed, using fallback. Error: {str(e)}")]
+        }
     
-    return state
\ No newline at end of file
+    return update
\ No newline at end of file
@@ -1,10 +1,117 @@
 """Node 1: PDF Parsing"""
 
+import multiprocessing
 import re
+import threading
+from concurrent.futures import ProcessPoolExecutor
 from langchain_core.messages import AIMessage
+from core.config import PDF_BACKEND, PDF_WORKERS
 from core.state import GraphState
 from utils.sample_data import get_sample_statement_text, get_sample_transactions
 
+# Pages are joined with a form feed so later nodes can find page boundaries
+PAGE_SEPARATOR = "\f"
+
+# Minimum pages per worker before extraction is parallelized
+PARALLEL_PAGE_THRESHOLD = 50
+
+# Extraction worker pool, started on first use and kept for the process lifetime
+_POOL = None
+_POOL_LOCK = threading.Lock()
+
+def _get_pool() -> ProcessPoolExecutor:
+    """
+    Shared pool of PDF_WORKERS extraction processes
+    
+    Workers are spawned rather than forked: parsing runs on Streamlit and
+    LangGraph worker threads, and forking a multithreaded process is unsafe.
+    Spawned workers import this module once and are then reused.
+    """
+    global _POOL
+    with _POOL_LOCK:
+        if _POOL is None:
+            _POOL = ProcessPoolExecutor(
+                max_workers=PDF_WORKERS,
+                mp_context=multiprocessing.get_context("spawn")
+            )
+        return _POOL
+
+def _text_flags() -> int:
+    """Plain text extraction only; skip the extra CID/unknown-glyph handling"""
+    import fitz
+    return fitz.TEXT_PRESERVE_LIGATURES | fitz.TEXT_PRESERVE_WHITESPACE | fitz.TEXT_MEDIABOX_CLIP
+
+def _open_document(source):
+    """Open a PyMuPDF document from a file path or from the PDF bytes themselves"""
+    import fitz
+    if isinstance(source, bytes):
+        return fitz.open(stream=source, filetype="pdf")
+    return fitz.open(source)
+
+def _extract_page_range(source, password: str, start: int, stop: int) -> list[str]:
+    """Extract text from pages [start, stop) using a separately opened document"""
+    text_flags = _text_flags()
+    with _open_document(source) as doc:
+        if doc.is_encrypted:
+            doc.authenticate(password)
+        return [doc[i].get_text("text", flags=text_flags, sort=False) for i in range(start, stop)]
+
+def _extract_pages(doc, source, password: str) -> list[str]:
+    """Extract the text of every page of an opened (and authenticated) document"""
+    # With PDF_WORKERS set, long statement files are split into page ranges across
+    # worker processes (MuPDF documents are not thread-safe, so each worker opens
+    # its own); in-memory uploads stay here rather than pickling the bytes to every worker
+    workers = min(PDF_WORKERS, doc.page_count // PARALLEL_PAGE_THRESHOLD)
+    if workers > 1 and not isinstance(source, bytes):
+        bounds = [doc.page_count * i // workers for i in range(workers + 1)]
+        parts = _get_pool().map(
+            _extract_page_range,
+            [source] * workers, [password] * workers,
+            bounds[:-1], bounds[1:]
+        )
+        return [text for part in parts for text in part]
+    
+    text_flags = _text_flags()
+    return [page.get_text("text", flags=text_flags, sort=False) for page in doc]
+
+def _extract_pages_pdfium(source, password: str) -> list[str]:
+    """Extract the text of every page with pypdfium2's range-based text extraction"""
+    import pypdfium2 as pdfium
+    
+    pdf = pdfium.PdfDocument(source, password=password or None)
+    try:
+        page_texts = []
+        for page in pdf:
+            textpage = page.get_textpage()
+            # PDFium separates lines with CRLF
+            page_texts.append(textpage.get_text_range().replace("\r\n", "\n"))
+            textpage.close()
+            page.close()
+        return page_texts
+    finally:
+        pdf.close()
+
+def _use_pdf_text(state: GraphState, pdf_name: str, raw_text: str) -> GraphState:
+    """Store successfully extracted statement text"""
+    state["raw_text"] = raw_text
+    state["processing_status"] = "pdf_parsed"
+    state["messages"] = [
+        AIMessage(content=f"📄 Successfully parsed PDF: {pdf_name}")
+    ]
+    return state
+
+def _fallback_to_sample(state: GraphState, error: str) -> GraphState:
+    """Fall back to sample data after a PDF parsing failure"""
+    error_msg = f"PDF parsing error: {error}"
+    state["errors"] = [error_msg]
+    state["raw_text"] = get_sample_statement_text()
+    state["transactions"] = get_sample_transactions()
+    state["processing_status"] = "using_sample_data"
+    state["messages"] = [
+        AIMessage(content=f"⚠️ PDF parsing failed, using sample data. Error: {error}")
+    ]
+    return state
+
 def parse_pdf_node(state: GraphState) -> GraphState:
     """
     Node 1: Parse PDF bank statement or use sample data
@@ -12,8 +119,9 @@ def parse_pdf_node(state: GraphState) -> GraphState:
     """
     
     pdf_path = state.get("pdf_path")
+    pdf_bytes = state.get("pdf_bytes")
     
-    if not pdf_path:
+    if not pdf_path and not pdf_bytes:
         # Use sample data
         state["raw_text"] = get_sample_statement_text()
         state["transactions"] = get_sample_transactions()
@@ -23,51 +131,44 @@ def parse_pdf_node(state: GraphState) -> GraphState:
         ]
         return state
     
+    # In-memory uploads are parsed straight from their bytes (no temporary file);
+    # the bytes are released once parsed, like raw_text after extraction
+    source = pdf_bytes or pdf_path
+    pdf_name = pdf_path or "uploaded statement"
+    if pdf_bytes:
+        state["pdf_bytes"] = b""
+    
+    # Optional pypdfium2 backend; anything it can't read goes through PyMuPDF below
+    if PDF_BACKEND == "pypdfium2":
+        try:
+            raw_text = PAGE_SEPARATOR.join(_extract_pages_pdfium(source, state.get("pdf_password", "")))
+        except Exception:
+            raw_text = ""
+        if raw_text.strip():
+            return _use_pdf_text(state, pdf_name, raw_text)
+    
+    # Only PyMuPDF calls can fail here; everything else is explicit branching
     try:
-        # Try to parse PDF
-        import fitz  # PyMuPDF
-        
-        raw_text = ""
+        doc = _open_document(source)  # PyMuPDF
+    except Exception as e:
+        return _fallback_to_sample(state, f"Failed to parse PDF: {str(e)}")
+    
+    # The context manager closes the document on every path out of the block
+    with doc:
+        # Check if password protected
+        password = state.get("pdf_password", "")
+        if doc.is_encrypted and not password:
+            return _fallback_to_sample(state, "Failed to parse PDF: PDF is password protected but no password provided")
+        if doc.is_encrypted and not doc.authenticate(password):
+            return _fallback_to_sample(state, "Failed to parse PDF: Invalid PDF password")
         
-        # Use PyMuPDF for text extraction
         try:
-            doc = fitz.open(pdf_path)
-            
-            # Check if password protected
-            if doc.is_encrypted:
-                password = state.get("pdf_password", "")
-                if password:
-                    if not doc.authenticate(password):
-                        raise ValueError("Invalid PDF password")
-                else:
-                    raise ValueError("PDF is password protected but no password provided")
-            
-            for page in doc:
-                raw_text += page.get_text()
-            doc.close()
-            
-            if raw_text.strip():
-                state["raw_text"] = raw_text
-                state["processing_status"] = "pdf_parsed"
-                state["messages"] = [
-                    AIMessage(content=f"📄 Successfully parsed PDF: {pdf_path}")
-                ]
-                return state
-            else:
-                raise ValueError("No text extracted from PDF - may be scanned/image-based")
-                
+            page_texts = _extract_pages(doc, source, password)
         except Exception as e:
-            raise ValueError(f"Failed to parse PDF: {str(e)}")
-            
-    except Exception as e:
-        # Fallback to sample data
-        error_msg = f"PDF parsing error: {str(e)}"
-        state["errors"] = [error_msg]
-        state["raw_text"] = get_sample_statement_text()
-        state["transactions"] = get_sample_transactions()
-        state["processing_status"] = "using_sample_data"
-        state["messages"] = [
-            AIMessage(content=f"⚠️ PDF parsing failed, using sample data. Error: {str(e)}")
-        ]
+            return _fallback_to_sample(state, f"Failed to parse PDF: {str(e)}")
     
-    return state
+    raw_text = PAGE_SEPARATOR.join(page_texts)
+    if not raw_text.strip():
+        return _fallback_to_sample(state, "Failed to parse PDF: No text extracted from PDF - may be scanned/image-based")
+    
+    return _use_pdf_text(state, pdf_name, raw_text)
@@ -1,65 +1,213 @@
 """Node 3: PII Redaction and Credit Filtering"""
 
 import re
+import threading
+from bisect import bisect_right
+from itertools import accumulate
 from langchain_core.messages import AIMessage
 from core.state import GraphState
 
-def redact_pii_node(state: GraphState) -> GraphState:
+try:
+    import hyperscan  # Optional: find the descriptions that contain PII in one DFA pass
+except ImportError:
+    hyperscan = None
+
+# Raw PII expressions, shared by the regex and Hyperscan matchers
+_PII_EXPRESSIONS = {
+    "mobile": r'\b\d{10}\b',
+    "upi": r'\b[A-Za-z0-9._%+-]+@[A-Za-z0-9.-]+\b',
+    "account": r'\b\d{8,}\b'
+}
+
+# PII patterns fused into one alternation; the group name selects the replacement.
+# Mobile numbers are tried before the more general 8+ digit account pattern.
+_MOBILE_PATTERN = f"(?P<mobile>{_PII_EXPRESSIONS['mobile']})"
+_UPI_PATTERN = f"(?P<upi>{_PII_EXPRESSIONS['upi']})"
+_ACCOUNT_PATTERN = f"(?P<account>{_PII_EXPRESSIONS['account']})"
+_PII_RE = re.compile(f"{_MOBILE_PATTERN}|{_UPI_PATTERN}|{_ACCOUNT_PATTERN}")
+# Narrower scans for text that can't contain UPI IDs (no '@') or numbers (no digits)
+_DIGIT_PII_RE = re.compile(f"{_MOBILE_PATTERN}|{_ACCOUNT_PATTERN}")
+_UPI_RE = re.compile(_UPI_PATTERN)
+_DIGITS = "0123456789"
+_PII_REPLACEMENTS = {
+    "mobile": "[MOBILE_REDACTED]",
+    "upi": "[UPI_ID_REDACTED]",
+    "account": "[ACCOUNT_REDACTED]"
+}
+
+# Joins descriptions for the batched scan; none of the PII patterns can match it
+_SEPARATOR = "\x1e"
+
+def _build_pii_database():
+    """Compile the PII expressions into a Hyperscan database"""
+    database = hyperscan.Database()
+    database.compile(
+        expressions=[expression.encode() for expression in _PII_EXPRESSIONS.values()],
+        ids=list(range(len(_PII_EXPRESSIONS))),
+        elements=len(_PII_EXPRESSIONS)
+    )
+    return database
+
+_PII_DB = _build_pii_database() if hyperscan else None
+_scan_local = threading.local()
+
+def _collect_match(pattern_id, start, end, flags, matched):
+    matched.append(end)
+
+def _get_scratch():
+    # Scratch space can't be shared between concurrent scans
+    scratch = getattr(_scan_local, "scratch", None)
+    if scratch is None:
+        scratch = _scan_local.scratch = hyperscan.Scratch(_PII_DB)
+    return scratch
+
+def _rows_with_pii(descriptions: list) -> list:
+    """
+    Find the descriptions that may contain PII with one Hyperscan pass
+    
+    Hyperscan's \\d and \\b are ASCII-only, so descriptions with other
+    characters are always returned and left to the regex to decide.
+    """
+    encoded = [desc.encode() for desc in descriptions]
+    # Start offset of every description inside the joined blob
+    starts = list(accumulate((len(data) + 1 for data in encoded), initial=0))
+    
+    matched = []
+    _PII_DB.scan(
+        _SEPARATOR.encode().join(encoded),
+        match_event_handler=_collect_match,
+        context=matched,
+        scratch=_get_scratch()
+    )
+    
+    rows = {bisect_right(starts, end - 1) - 1 for end in matched}
+    rows.update(row for row, desc in enumerate(descriptions) if not desc.isascii())
+    return sorted(rows)
+
+def _redact_text(text: str, amount, pattern) -> tuple:
+    """Redact PII from one description; returns (redacted text, set of PII kinds found)"""
+    kinds = set()
+    
+    def replace(match):
+        kind = match.lastgroup
+        # Don't redact an account-like number that is actually the amount field
+        if kind == "account" and match.group() in _amount_tokens(amount):
+            return match.group()
+        kinds.add(kind)
+        return _PII_REPLACEMENTS[kind]
+    
+    return pattern.sub(replace, text), kinds
+
+def _amount_tokens(amount) -> set:
+    """Digit strings the amount may appear as inside a description"""
+    tokens = {str(amount)}
+    try:
+        value = float(amount)
+    except (TypeError, ValueError):
+        return tokens
+    if value.is_integer():
+        tokens.add(str(int(value)))
+    tokens.add(format(value, ".2f").replace(".", ""))
+    return tokens
+
+def _pii_pattern(text: str):
+    """Narrowest PII pattern that can match anything in text (None if nothing can)"""
+    has_upi = "@" in text
+    has_digits = any(digit in text for digit in _DIGITS)
+    if has_upi and has_digits:
+        return _PII_RE
+    if has_digits:
+        return _DIGIT_PII_RE
+    if has_upi:
+        return _UPI_RE
+    return None
+
+def _redact_descriptions(descriptions: list, amounts: list) -> tuple:
+    """
+    Redact PII from all descriptions with one scan over their concatenation
+    
+    Args:
+        descriptions: Transaction descriptions
+        amounts: Transaction amounts, aligned with descriptions
+    
+    Returns:
+        Tuple of (redacted descriptions, set of PII kinds found per description)
+    """
+    if _PII_DB is not None:
+        # Only the descriptions Hyperscan flags go through the regex
+        redacted = list(descriptions)
+        matched_kinds = [set() for _ in descriptions]
+        for row in _rows_with_pii(descriptions):
+            redacted[row], matched_kinds[row] = _redact_text(descriptions[row], amounts[row], _PII_RE)
+        return redacted, matched_kinds
+    
+    # Start offset of every description inside the joined blob
+    starts = list(accumulate((len(desc) + 1 for desc in descriptions), initial=0))
+    blob = _SEPARATOR.join(descriptions)
+    pieces = [[] for _ in descriptions]
+    positions = starts[:-1]
+    matched_kinds = [set() for _ in descriptions]
+    
+    # Cheap substring checks rule out whole PII kinds before the regex scan
+    pattern = _pii_pattern(blob)
+    if pattern is None:
+        return list(descriptions), matched_kinds
+    
+    for match in pattern.finditer(blob):
+        row = bisect_right(starts, match.start()) - 1
+        kind = match.lastgroup
+        
+        # Don't redact an account-like number that is actually the amount field
+        if kind == "account" and match.group() in _amount_tokens(amounts[row]):
+            continue
+        
+        pieces[row].append(blob[positions[row]:match.start()])
+        pieces[row].append(_PII_REPLACEMENTS[kind])
+        positions[row] = match.end()
+        matched_kinds[row].add(kind)
+    
+    redacted = [
+        "".join(parts) + blob[positions[row]:starts[row + 1] - 1] if parts else descriptions[row]
+        for row, parts in enumerate(pieces)
+    ]
+    return redacted, matched_kinds
+
+def redact_pii_node(state: GraphState) -> dict:
     """
     Node 3: Redact PII from transactions for DPDP Act compliance
     Removes sensitive payment references before sending to LLM
     ALSO filters to only include DEBIT transactions (spends only)
     """
-    redacted_transactions = []
-    pii_redacted_count = 0
-    credit_count = 0
-    debit_count = 0
+    transactions = state.get("transactions", [])
     
-    for transaction in state.get("transactions", []):
-        # Filter: Only process DEBIT transactions (actual spending)
-        if transaction.get("type", "").lower() == "credit":
-            credit_count += 1
-            continue
-            
-        debit_count += 1
-        original_desc = transaction.get("description", "")
-        redacted_desc = original_desc
-        
-        # Redact mobile numbers (10 digits)
-        if re.search(r'\b\d{10}\b', redacted_desc):
-            redacted_desc = re.sub(r'\b\d{10}\b', '[MOBILE_REDACTED]', redacted_desc)
-            pii_redacted_count += 1
-        
-        # Redact UPI IDs (email-like patterns)
-        if re.search(r'\b[A-Za-z0-9._%+-]+@[A-Za-z0-9.-]+\b', redacted_desc):
-            redacted_desc = re.sub(r'\b[A-Za-z0-9._%+-]+@[A-Za-z0-9.-]+\b', '[UPI_ID_REDACTED]', redacted_desc)
-            pii_redacted_count += 1
-        
-        # Redact account numbers (8+ digits, but not amounts)
-        account_pattern = r'\b\d{8,}\b'
-        if re.search(account_pattern, redacted_desc):
-            # Don't redact if it's the amount field
-            if str(transaction.get("amount", "")) not in redacted_desc:
-                redacted_desc = re.sub(account_pattern, '[ACCOUNT_REDACTED]', redacted_desc)
-                pii_redacted_count += 1
-        
-        # Create redacted transaction
-        redacted_transaction = {
-            **transaction,
-            "description": redacted_desc,
-            "original_description": original_desc
-        }
-        
-        redacted_transactions.append(redacted_transaction)
+    # Filter: Only process DEBIT transactions (actual spending)
+    debits = [t for t in transactions if t.get("type", "").lower() != "credit"]
+    credit_count = len(transactions) - len(debits)
+    debit_count = len(debits)
     
-    state["redacted_transactions"] = redacted_transactions
-    state["pii_redacted_count"] = pii_redacted_count
-    state["credits_filtered_count"] = credit_count
-    state["debits_processed_count"] = debit_count
+    # Redact mobile numbers, UPI IDs and account numbers for all debits in a single scan
+    original_descs = [t.get("description", "") for t in debits]
+    redacted_descs, matched_kinds = _redact_descriptions(
+        original_descs, [t.get("amount", "") for t in debits]
+    )
+    pii_redacted_count = sum(len(kinds) for kinds in matched_kinds)
     
-    state["messages"] = state.get("messages", []) + [
-        AIMessage(content=f"✅ PII redacted from {pii_redacted_count} transactions"),
-        AIMessage(content=f"✅ Filtered {credit_count} credit transactions, processing {debit_count} debits only")
-    ]
+    # Create redacted copies (the extracted transactions keep their original descriptions)
+    redacted_transactions = []
+    for transaction, original_desc, redacted_desc in zip(debits, original_descs, redacted_descs):
+        redacted_transaction = transaction.copy()
+        redacted_transaction["description"] = redacted_desc
+        redacted_transaction["original_description"] = original_desc
+        redacted_transactions.append(redacted_transaction)
     
-    return state
+    # Only this node's keys are returned; the messages reducer appends the new messages
+    return {
+        "redacted_transactions": redacted_transactions,
+        "pii_redacted_count": pii_redacted_count,
+        "credits_filtered_count": credit_count,
+        "debits_processed_count": debit_count,
+        "messages": [
+            AIMessage(content=f"✅ PII redacted from {pii_redacted_count} transactions"),
+            AIMessage(content=f"✅ Filtered {credit_count} credit transactions, processing {debit_count} debits only")
+        ]
+    }
@@ -0,0 +1,57 @@
+"""Result Cache: entry check and final store around the analysis nodes"""
+
+from langchain_core.messages import AIMessage
+from core.config import CACHE_RESULTS
+from core.state import GraphState
+from utils.result_cache import result_cache_key, load_cached_result, store_cached_result, is_cacheable_result
+
+def check_result_cache_node(state: GraphState) -> GraphState:
+    """
+    Entry node: reuse the finished analysis of an identical statement
+    Sample-data runs, unreadable files and runs without CACHE_RESULTS always
+    go through the full pipeline (and are not stored)
+    """
+    pdf_path = state.get("pdf_path")
+    pdf_bytes = state.get("pdf_bytes")
+    if not CACHE_RESULTS or (not pdf_path and not pdf_bytes):
+        return state
+    
+    try:
+        key = result_cache_key(
+            pdf_path,
+            state.get("pdf_password", ""),
+            state.get("llm_provider", ""),
+            state.get("llm_model", ""),
+            pdf_bytes
+        )
+    except OSError:
+        # parse_pdf reports the unreadable file
+        return state
+    
+    state["result_cache_key"] = key
+    cached_result = load_cached_result(key)
+    if cached_result is None:
+        return state
+    
+    state.update(cached_result)
+    state["result_cache_hit"] = True
+    if pdf_bytes:
+        state["pdf_bytes"] = b""  # parse_pdf (which would release it) is skipped
+    state["messages"] = [
+        AIMessage(content=f"♻️ Reused the earlier analysis of {pdf_path or 'the uploaded statement'} (statement unchanged)")
+    ]
+    return state
+
+def route_after_cache_check(state: GraphState) -> str:
+    """Skip the pipeline when the cache check found a result"""
+    return "hit" if state.get("result_cache_hit") else "miss"
+
+def store_result_node(state: GraphState) -> dict:
+    """
+    Final node: cache the finished analysis for identical statements
+    Runs with errors (PDF or LLM fallbacks) are not cached
+    """
+    key = state.get("result_cache_key")
+    if key and is_cacheable_result(state):
+        store_cached_result(key, state)
+    return {}
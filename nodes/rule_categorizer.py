@@ -1,11 +1,10 @@
 """Node 4: Rule-based Categorization"""
 
-import re
 from langchain_core.messages import AIMessage
 from core.state import GraphState
-from utils.patterns import categorize_transaction
+from utils.patterns import categorize_transactions
 
-def rule_based_categorization_node(state: GraphState) -> GraphState:
+def rule_based_categorization_node(state: GraphState) -> dict:
     """
     Node 4: Apply rule-based categorization using merchant patterns
     Fast categorization for known merchants
@@ -14,30 +13,28 @@ def rule_based_categorization_node(state: GraphState) -> GraphState:
     uncategorized_transactions = []
     rule_based_count = 0
     
-    for transaction in state.get("redacted_transactions", []):
-        description = transaction.get("description", "")
-        category = categorize_transaction(description)
-        
+    transactions = state.get("redacted_transactions", [])
+    # Match every description against the merchant patterns in one batch
+    categories = categorize_transactions([t.get("description", "") for t in transactions])
+    
+    for transaction, category in zip(transactions, categories):
         if category:
-            # Successfully categorized by rules
-            categorized_transaction = {
-                **transaction,
-                "category": category,
-                "categorization_method": "rule_based"
-            }
-            categorized_transactions.append(categorized_transaction)
+            # Successfully categorized by rules (redacted copies are owned by this pipeline)
+            transaction["category"] = category
+            transaction["categorization_method"] = "rule_based"
+            categorized_transactions.append(transaction)
             rule_based_count += 1
         else:
             # Needs LLM categorization
             uncategorized_transactions.append(transaction)
     
-    state["rule_categorized"] = categorized_transactions
-    state["uncategorized"] = uncategorized_transactions
-    state["rule_based_count"] = rule_based_count
-    
-    state["messages"] = state.get("messages", []) + [
-        AIMessage(content=f"✅ Rule-based categorization: {rule_based_count} transactions"),
-        AIMessage(content=f"⏳ Remaining for LLM categorization: {len(uncategorized_transactions)} transactions")
-    ]
-    
-    return state
\ No newline at end of file
+    # Runs in parallel with the high-value filter, so only this node's keys are returned
+    return {
+        "rule_categorized": categorized_transactions,
+        "uncategorized": uncategorized_transactions,
+        "rule_based_count": rule_based_count,
+        "messages": [
+            AIMessage(content=f"✅ Rule-based categorization: {rule_based_count} transactions"),
+            AIMessage(content=f"⏳ Remaining for LLM categorization: {len(uncategorized_transactions)} transactions")
+        ]
+    }
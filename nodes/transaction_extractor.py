@@ -1,52 +1,77 @@
 """Node 2: Transaction Extraction"""
 
+import hashlib
 import json
+import logging
+import os
 import re
+import tempfile
+import time
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
 from langchain_core.messages import AIMessage
 from langchain_core.prompts import ChatPromptTemplate
+from langchain_core.runnables import RunnableConfig
 
+from core.config import CACHE_EXTRACTIONS
 from core.state import GraphState
 from core.llm_factory import get_llm
 from utils.sample_data import get_sample_transactions
 
-def extract_transactions_node(state: GraphState) -> GraphState:
-    """
-    Node 2: Extract structured transactions from raw text using Groq LLM
-    Sends all bank statements to LLM for extraction
-    """
-    
-    # Skip if already have transactions (from sample data)
-    if state.get("processing_status") == "using_sample_data" and state.get("transactions"):
-        state["messages"] = state.get("messages", []) + [
-            AIMessage(content=f"Using {len(state['transactions'])} sample transactions")
-        ]
-        return state
-    
-    # Use OpenAI for transaction extraction (better for large PDFs)
-    llm = get_llm(
-        provider="openai",
-        model="gpt-4o-mini",  # Cost-effective for extraction
-        temperature=0,  # Make output more deterministic
-        max_tokens=16000  # OpenAI has higher limits
-    )
-    
-    # OpenAI can handle larger texts, but still truncate if extremely large
-    raw_text = state["raw_text"]
-    MAX_CHARS = 100000  # OpenAI can handle much more
-    
-    if len(raw_text) > MAX_CHARS:
-        print(f"\n⚠️  PDF text too large ({len(raw_text)} chars). Truncating to {MAX_CHARS} chars...")
-        # Try to keep the middle section (where most transactions are)
-        # Skip first 2000 chars (headers) and take the next MAX_CHARS
-        start_pos = min(2000, len(raw_text) // 10)
-        raw_text = raw_text[start_pos:start_pos + MAX_CHARS]
-        print(f"✓ Truncated to {len(raw_text)} characters")
-    else:
-        print(f"✓ PDF text size OK: {len(raw_text)} characters")
-    
-    # Universal bank statement extraction prompt
-    prompt = ChatPromptTemplate.from_messages([
-        ("system", """You are an expert Indian bank statement parser. Extract ALL transactions from this bank statement.
+try:
+    import orjson  # Optional: faster parsing of large extracted arrays
+except ImportError:
+    orjson = None
+
+try:
+    import ijson  # Optional: parse the extracted array while the response streams in
+except ImportError:
+    ijson = None
+
+logger = logging.getLogger(__name__)
+
+# Patterns for pulling a JSON array out of the LLM response
+_CODE_BLOCK_RE = re.compile(r'```(?:json)?\s*\n?(\[.*?\])\s*```', re.DOTALL)
+_CODE_BLOCK_LOOSE_RE = re.compile(r'```(?:json)?\s*\n?(\[.*)```', re.DOTALL)
+_OBJ_RE = re.compile(r'\{[\s\S]*?\}')
+_TRAILING_COMMA_ARR_RE = re.compile(r',\s*\]')
+_TRAILING_COMMA_OBJ_RE = re.compile(r',\s*\}')
+
+# Patterns for trimming statement text before it is sent to the LLM
+_SPACES_RE = re.compile(r'[ \t\u00a0]+')
+_PAGE_NUMBER_RE = re.compile(r'^page\s*\d+\s*(?:of|/)\s*\d+$', re.IGNORECASE)
+
+def _loads(json_str: str):
+    """Parse JSON text with orjson when installed, else the standard library"""
+    if orjson is not None:
+        # orjson.JSONDecodeError subclasses json.JSONDecodeError
+        return orjson.loads(json_str)
+    return json.loads(json_str)
+
+# Model used for extraction (part of the cache key)
+EXTRACTION_MODEL = "gpt-4o-mini"
+EXTRACTION_TEMPERATURE = 0  # Make output more deterministic
+EXTRACTION_MAX_TOKENS = 16000  # OpenAI has higher limits
+# Extracted transactions are cached here (only when CACHE_EXTRACTIONS is set),
+# keyed by cache version, model, prompt and statement text
+EXTRACTION_CACHE_DIR = os.path.join(".cache", "extract")
+EXTRACTION_CACHE_TTL_SECONDS = 24 * 60 * 60
+# Bump when parsing, sharding or shard merging changes the extracted transactions
+EXTRACTION_CACHE_VERSION = 3
+
+# Large statements are split into shards of at most this many characters
+SHARD_MAX_CHARS = 20000
+# Characters repeated at the start of each shard so boundary lines aren't cut
+SHARD_OVERLAP = 500
+# Maximum number of shards sent to the LLM at the same time
+EXTRACTION_MAX_CONCURRENCY = 8
+
+# Pages compared when learning the headers/footers repeated on every page
+HEADER_SAMPLE_PAGES = 3
+
+# Universal bank statement extraction prompt
+_PROMPT = ChatPromptTemplate.from_messages([
+    ("system", """You are an expert Indian bank statement parser. Extract ALL transactions from this bank statement.
 
 IMPORTANT: HDFC Bank Format Detection
 If you see columns like "Date | Narration | Chq./Ref.No. | Value Dt | Withdrawal Amt. | Deposit Amt. | Closing Balance":
@@ -91,130 +116,420 @@ Return format:
 [
   {{"date": "DD/MM/YYYY", "description": "...", "amount": 0.00, "type": "debit/credit", "balance": 0.00, "raw_text": "..."}}
 ]"""),
-        ("human", "Bank Statement Text:\n{statement_text}")
-    ])
+    ("human", "Bank Statement Text:\n{statement_text}")
+])
 
-    try:
-        chain = prompt | llm
+# Prompt wording is part of the extraction cache key
+_PROMPT_TEXT = "".join(message.prompt.template for message in _PROMPT.messages)
+
+def _split_into_shards(raw_text: str, max_chars: int = SHARD_MAX_CHARS, overlap: int = SHARD_OVERLAP) -> list:
+    """
+    Split statement text on line boundaries into overlapping shards
+    
+    Args:
+        raw_text: Full statement text
+        max_chars: Maximum characters per shard
+        overlap: Maximum characters repeated from the end of the previous shard
+    
+    Returns:
+        List of (shard, overlap_start) pairs covering the whole text, where
+        shard[overlap_start:] is the text the next shard starts with again
+    """
+    shards = []
+    start = 0
+    while len(raw_text) - start > max_chars:
+        # Cut after the last complete line that fits (hard cut for a single huge line)
+        cut = raw_text.rfind("\n", start, start + max_chars) + 1
+        if cut <= start:
+            cut = start + max_chars
+        
+        # Start the next shard at the earliest line beginning within the overlap window
+        line_end = raw_text.find("\n", max(start, cut - overlap - 1), cut)
+        next_start = line_end + 1 if line_end != -1 else cut
+        shards.append((raw_text[start:cut], next_start - start))
+        start = next_start
+    shards.append((raw_text[start:], len(raw_text) - start))
+    return shards
+
+def _transaction_key(txn: dict) -> tuple:
+    """Fields that identify the same transaction extracted from two shards"""
+    return (txn.get("date"), txn.get("amount"), txn.get("description"), txn.get("raw_text"))
+
+def _overlap_counts(overlap: str, shard_transactions: list) -> Counter:
+    """
+    Count the transactions of a shard that were read from its overlap lines
+    
+    Each transaction is counted at most as many times as its line occurs in
+    the overlap, so identical transactions earlier in the shard aren't.
+    """
+    lines = [line.strip() for line in overlap.splitlines()]
+    in_shard = Counter(_transaction_key(txn) for txn in shard_transactions)
+    counts = Counter()
+    for key, txn in {_transaction_key(txn): txn for txn in shard_transactions}.items():
+        marker = str(txn.get("raw_text") or txn.get("description") or "").strip()
+        occurrences = sum(1 for line in lines if marker and marker in line)
+        if occurrences:
+            counts[key] = min(in_shard[key], occurrences)
+    return counts
+
+def _merge_shard_transactions(shards: list, shard_results: list) -> list:
+    """
+    Join the transactions of consecutive shards
+    
+    A transaction read from the lines a shard repeats from the previous one
+    is extracted twice; only as many leading copies as the previous shard
+    read from that overlap are dropped. Identical transactions elsewhere in
+    the statement (e.g. two same-day payments of the same amount) are all kept.
+    """
+    transactions = []
+    repeated = Counter()
+    for (shard, overlap_start), shard_transactions in zip(shards, shard_results):
+        for txn in shard_transactions:
+            key = _transaction_key(txn)
+            if repeated[key]:
+                repeated[key] -= 1
+                continue
+            transactions.append(txn)
         
-        result = chain.invoke(
-            {"statement_text": raw_text},  # Use truncated text
-            config={
-                "run_name": "extract_transactions_openai", 
-                "tags": ["extraction", "openai", "gpt-4o-mini"]
-            }
-        )
+        # Transactions in the lines the next shard starts with
+        repeated = _overlap_counts(shard[overlap_start:], shard_transactions)
+    return transactions
+
+def _common_edge_lines(pages: list, from_end: bool = False) -> int:
+    """Number of leading (or trailing) lines identical across the sampled pages"""
+    sample = [page[::-1] if from_end else page for page in pages[:HEADER_SAMPLE_PAGES]]
+    count = 0
+    for lines in zip(*sample):
+        if len(set(lines)) != 1:
+            break
+        count += 1
+    return count
+
+def _preprocess_statement_text(raw_text: str) -> str:
+    """
+    Trim statement text before it is sent to the LLM
+    
+    Collapses whitespace, drops blank and page-number lines, and keeps page
+    headers/footers repeated at the same position on every page only once.
+    
+    Args:
+        raw_text: Statement text with pages separated by form feeds
+    
+    Returns:
+        Trimmed statement text
+    """
+    pages = []
+    for page in _SPACES_RE.sub(" ", raw_text).split("\f"):
+        lines = [line.strip() for line in page.splitlines()]
+        lines = [line for line in lines if line and not _PAGE_NUMBER_RE.match(line)]
+        if lines:
+            pages.append(lines)
+    
+    if len(pages) > 1:
+        # Never treat a whole sampled page as header/footer
+        shortest = min(len(page) for page in pages[:HEADER_SAMPLE_PAGES])
+        head = min(_common_edge_lines(pages), shortest - 1)
+        tail = min(_common_edge_lines(pages, from_end=True), shortest - 1 - head)
+        header = pages[0][:head]
+        footer = pages[0][len(pages[0]) - tail:]
+        for i in range(1, len(pages)):
+            page = pages[i]
+            start = head if page[:head] == header else 0
+            stop = len(page) - tail if tail and page[len(page) - tail:] == footer else len(page)
+            pages[i] = page[start:max(start, stop)]
+    
+    return "".join(line + "\n" for page in pages for line in page)
+
+def _cache_path(raw_text: str, model: str) -> str:
+    """Cache file for a statement's extracted transactions"""
+    digest = hashlib.sha256()
+    for part in (str(EXTRACTION_CACHE_VERSION), model, _PROMPT_TEXT, raw_text):
+        digest.update(part.encode() + b"\0")
+    return os.path.join(EXTRACTION_CACHE_DIR, f"{digest.hexdigest()}.json")
+
+def _load_cached_transactions(path: str):
+    """Return cached transactions, or None if there is no usable (unexpired) cache entry"""
+    try:
+        if time.time() - os.path.getmtime(path) > EXTRACTION_CACHE_TTL_SECONDS:
+            os.remove(path)
+            return None
+        with open(path, "r", encoding="utf-8") as f:
+            return _loads(f.read())
+    except (OSError, ValueError):
+        return None
+
+def _store_cached_transactions(path: str, transactions: list) -> None:
+    """Write the cache entry atomically so concurrent runs never see a partial file"""
+    try:
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(path), suffix=".tmp")
+        try:
+            with os.fdopen(fd, "w", encoding="utf-8") as f:
+                json.dump(transactions, f)
+            os.replace(tmp_path, path)
+        except BaseException:
+            os.remove(tmp_path)
+            raise
+    except OSError as e:
+        logger.warning("Could not cache extracted transactions: %s", e)
+
+def _parse_transactions(response_text: str) -> list:
+    """Pull the JSON array of transactions out of one LLM response"""
+    
+    # Debug: log first 1000 chars of response
+    if logger.isEnabledFor(logging.DEBUG):
+        logger.debug("LLM response (first 1000 chars):\n%s", response_text[:1000])
+        logger.debug("Total response length: %d characters", len(response_text))
+    
+    # Multiple strategies to extract JSON array
+    json_str = None
+    
+    # Strategy 1: MOST RELIABLE - Find first [ to last ]
+    # This works even when LLM adds explanatory text
+    first_bracket = response_text.find('[')
+    last_bracket = response_text.rfind(']')
+    logger.debug("Bracket positions: first=[%d], last=[%d]", first_bracket, last_bracket)
+    
+    if first_bracket != -1 and last_bracket != -1 and last_bracket > first_bracket:
+        json_str = response_text[first_bracket:last_bracket + 1]
+        if logger.isEnabledFor(logging.DEBUG):
+            logger.debug("Extracted JSON string length: %d characters", len(json_str))
+            logger.debug("First 200 chars of extracted JSON: %s", json_str[:200])
+            logger.debug("Last 200 chars of extracted JSON: %s", json_str[-200:])
+        logger.debug("Found JSON using bracket matching")
+    else:
+        logger.debug("Bracket matching failed")
+    # Strategy 2: Find JSON in code blocks (```json ... ```)
+    if not json_str:
+        # Try to capture bracketed array inside code block
+        code_block_match = _CODE_BLOCK_RE.search(response_text)
+        if code_block_match:
+            json_str = code_block_match.group(1)
+            logger.debug("Found JSON in code block")
+        else:
+            # If code block exists but missing closing bracket, try capturing from first '[' inside block
+            code_block_loose = _CODE_BLOCK_LOOSE_RE.search(response_text)
+            if code_block_loose:
+                json_str = code_block_loose.group(1)
+                logger.debug("Found partial JSON array in code block; will attempt to repair")
+    
+    # Strategy 3: Extract individual JSON objects and wrap into an array
+    if not json_str:
+        logger.debug("Attempting object-wise extraction as fallback")
+        objects = _OBJ_RE.findall(response_text)
+        if objects:
+            # Heuristic: filter out obviously non-transaction objects lacking required fields
+            required_fields = ['date', 'description', 'amount', 'type']
+            filtered = []
+            for obj in objects:
+                # Quick field check without full parse
+                field_hits = sum(1 for f in required_fields if f in obj)
+                if field_hits >= 3:  # keep likely transaction objects
+                    filtered.append(obj)
+            if filtered:
+                json_str = '[' + ',\n'.join(filtered) + ']'
+                logger.debug("Wrapped %d object(s) into JSON array from fallback", len(filtered))
+    
+    if not json_str:
+        # Save full response for debugging
+        with open("llm_response_debug.txt", "w", encoding="utf-8") as f:
+            f.write(response_text)
+        raise ValueError(f"LLM response did not contain valid JSON array. Response saved to llm_response_debug.txt. Preview: {response_text[:200]}")
+    
+    # Try to parse JSON as-is; repairs only run when that fails
+    try:
+        transactions = _loads(json_str)
+        logger.debug("Parsed JSON with %d transactions", len(transactions))
+        return transactions
+    except json.JSONDecodeError:
+        logger.debug("JSON did not parse as-is, attempting repairs")
+    
+    # Attempt to repair partial arrays: balance brackets by appending if missing
+    open_sq = json_str.count('[')
+    close_sq = json_str.count(']')
+    if open_sq > close_sq:
+        json_str = json_str + (']' * (open_sq - close_sq))
+        logger.debug("Repaired missing closing square bracket(s)")
+    open_curly = json_str.count('{')
+    close_curly = json_str.count('}')
+    if open_curly > close_curly:
+        json_str = json_str + ('}' * (open_curly - close_curly))
+        logger.debug("Repaired missing closing curly brace(s)")
+    
+    # Clean up the JSON string
+    # Remove any trailing commas before closing brackets
+    json_str = _TRAILING_COMMA_ARR_RE.sub(']', json_str)
+    json_str = _TRAILING_COMMA_OBJ_RE.sub('}', json_str)
+    
+    try:
+        transactions = _loads(json_str)
+        logger.debug("Parsed repaired JSON with %d transactions", len(transactions))
+    except json.JSONDecodeError as je:
+        logger.debug("JSON parse failed at position %s: %s", getattr(je, "pos", "unknown"), je)
         
-        # Parse LLM response
-        response_text = result.content if hasattr(result, 'content') else str(result)
+        # Try fixing common issues
         
-        # Debug: Print first 1000 chars of response
-        print("\n=== LLM Response (first 1000 chars) ===")
-        print(response_text[:1000])
-        print("\n=== End Preview ===")
-        print(f"Total response length: {len(response_text)} characters")
+        # Fix 1: Replace single quotes with double quotes
+        json_str_fixed = json_str.replace("'", '"')
+        try:
+            transactions = _loads(json_str_fixed)
+            logger.debug("Fixed JSON by replacing single quotes")
+        except:
+            # Fix 2: Try removing trailing commas
+            json_str_fixed = _TRAILING_COMMA_OBJ_RE.sub('}', json_str_fixed)
+            json_str_fixed = _TRAILING_COMMA_ARR_RE.sub(']', json_str_fixed)
+            try:
+                transactions = _loads(json_str_fixed)
+                logger.debug("Fixed JSON by removing trailing commas")
+            except Exception as final_error:
+                # Save problematic JSON for debugging
+                with open("json_error_debug.txt", "w", encoding="utf-8") as f:
+                    f.write(json_str)
+                logger.warning("All JSON fixes failed; saved to json_error_debug.txt")
+                raise ValueError(f"Failed to parse JSON after all fixes. Original error: {str(je)}. Final error: {str(final_error)}")
+    
+    return transactions
+
+def _stream_transactions(chunks) -> tuple:
+    """
+    Parse transactions out of a streamed response as the JSON array arrives
+    
+    Args:
+        chunks: Iterator of response text chunks
+    
+    Returns:
+        Tuple of (transactions, or None if the stream wasn't a clean JSON array; full response text)
+    """
+    events = ijson.sendable_list()
+    parser = ijson.parse_coro(events, use_float=True)
+    received = []
+    transactions = []
+    builder = None
+    parsing = True
+    started = False
+    finished = False
+    
+    for chunk in chunks:
+        received.append(chunk)
+        if not parsing:
+            continue
         
-        # Multiple strategies to extract JSON array
-        json_str = None
+        # Skip any explanatory text before the array
+        if not started:
+            start = chunk.find('[')
+            if start == -1:
+                continue
+            chunk = chunk[start:]
+            started = True
         
-        # Strategy 1: MOST RELIABLE - Find first [ to last ]
-        # This works even when LLM adds explanatory text
-        first_bracket = response_text.find('[')
-        last_bracket = response_text.rfind(']')
-        print(f"\nBracket positions: first=[{first_bracket}], last=[{last_bracket}]")
+        try:
+            parser.send(chunk.encode())
+        except ijson.JSONError:
+            # Trailing text after the array also lands here; events parsed so far are kept
+            parsing = False
         
-        if first_bracket != -1 and last_bracket != -1 and last_bracket > first_bracket:
-            json_str = response_text[first_bracket:last_bracket + 1]
-            print(f"Extracted JSON string length: {len(json_str)} characters")
-            print(f"First 200 chars of extracted JSON: {json_str[:200]}")
-            print(f"Last 200 chars of extracted JSON: {json_str[-200:]}")
-            print("✓ Found JSON using bracket matching")
-        else:
-            print("✗ Bracket matching failed")
-        # Strategy 2: Find JSON in code blocks (```json ... ```)
-        if not json_str:
-            # Try to capture bracketed array inside code block
-            code_block_match = re.search(r'```(?:json)?\s*\n?(\[.*?\])\s*```', response_text, re.DOTALL)
-            if code_block_match:
-                json_str = code_block_match.group(1)
-                print("Found JSON in code block")
-            else:
-                # If code block exists but missing closing bracket, try capturing from first '[' inside block
-                code_block_loose = re.search(r'```(?:json)?\s*\n?(\[.*)```', response_text, re.DOTALL)
-                if code_block_loose:
-                    json_str = code_block_loose.group(1)
-                    print("Found partial JSON array in code block; will attempt to repair")
+        for prefix, event, value in events:
+            if prefix == "" and event == "end_array":
+                finished = True
+                break
+            if builder is None:
+                if prefix != "item" or event != "start_map":
+                    continue
+                builder = ijson.ObjectBuilder()
+            builder.event(event, value)
+            if prefix == "item" and event == "end_map":
+                transactions.append(builder.value)
+                builder = None
+        del events[:]
         
-        # Strategy 3: Extract individual JSON objects and wrap into an array
-        if not json_str:
-            print("Attempting object-wise extraction as fallback...")
-            objects = re.findall(r'\{[\s\S]*?\}', response_text)
-            if objects:
-                # Heuristic: filter out obviously non-transaction objects lacking required fields
-                required_fields = ['date', 'description', 'amount', 'type']
-                filtered = []
-                for obj in objects:
-                    # Quick field check without full parse
-                    field_hits = sum(1 for f in required_fields if f in obj)
-                    if field_hits >= 3:  # keep likely transaction objects
-                        filtered.append(obj)
-                if filtered:
-                    json_str = '[' + ',\n'.join(filtered) + ']'
-                    print(f"Wrapped {len(filtered)} object(s) into JSON array from fallback")
+        if finished:
+            parsing = False
+    
+    return (transactions if finished else None), "".join(received)
+
+def _extract_shard(chain, shard: str, config: dict) -> list:
+    """Extract the transactions in one shard, parsing the response while it streams"""
+    stream = (
+        chunk.content if hasattr(chunk, 'content') else str(chunk)
+        for chunk in chain.stream({"statement_text": shard}, config=config)
+    )
+    
+    if ijson is None:
+        return _parse_transactions("".join(stream))
+    
+    transactions, response_text = _stream_transactions(stream)
+    if transactions is None:
+        # Not a clean array (e.g. needs repairs); use the full set of strategies
+        return _parse_transactions(response_text)
+    logger.debug("Parsed %d transactions from streamed response", len(transactions))
+    return transactions
+
+def extract_transactions_node(state: GraphState, config: RunnableConfig = None) -> dict:
+    """
+    Node 2: Extract structured transactions from raw text using Groq LLM
+    Sends all bank statements to LLM for extraction
+    Only this node's keys are returned; the messages reducer appends the new messages
+    """
+    
+    # Skip if already have transactions (from sample data)
+    if state.get("processing_status") == "using_sample_data" and state.get("transactions"):
+        return {
+            "messages": [AIMessage(content=f"Using {len(state['transactions'])} sample transactions")]
+        }
+    
+    # No later node needs the statement text, so every update below clears it
+    raw_text = state["raw_text"]
+    
+    # Re-runs on the same statement reuse the earlier extraction (when enabled)
+    cache_path = _cache_path(raw_text, EXTRACTION_MODEL) if CACHE_EXTRACTIONS else None
+    cached_transactions = _load_cached_transactions(cache_path) if cache_path else None
+    if cached_transactions:
+        return {
+            "raw_text": "",
+            "transactions": cached_transactions,
+            "extraction_method": "openai_llm",
+            "processing_status": "llm_extracted",
+            "messages": [
+                AIMessage(content=f"✅ Loaded {len(cached_transactions)} previously extracted transactions from cache")
+            ]
+        }
+    
+    # Use OpenAI for transaction extraction (better for large PDFs)
+    llm = get_llm(
+        provider="openai",
+        model=EXTRACTION_MODEL,  # Cost-effective for extraction
+        temperature=EXTRACTION_TEMPERATURE,
+        max_tokens=EXTRACTION_MAX_TOKENS
+    )
+    
+    # Only the trimmed text is sent to the LLM
+    statement_text = _preprocess_statement_text(raw_text)
+    
+    # Statements are split into shards that are extracted concurrently
+    shards = _split_into_shards(statement_text)
+    logger.info(
+        "PDF text size: %d characters, %d after trimming, in %d shard(s)",
+        len(raw_text), len(statement_text), len(shards)
+    )
+    
+    try:
+        chain = _PROMPT | llm
         
-        if not json_str:
-            # Save full response for debugging
-            with open("llm_response_debug.txt", "w", encoding="utf-8") as f:
-                f.write(response_text)
-            raise ValueError(f"LLM response did not contain valid JSON array. Response saved to llm_response_debug.txt. Preview: {response_text[:200]}")
+        max_concurrency = (config or {}).get("configurable", {}).get("max_concurrency")
+        chain_config = {
+            "run_name": "extract_transactions_openai", 
+            "tags": ["extraction", "openai", "gpt-4o-mini"]
+        }
         
-        # Attempt to repair partial arrays: balance brackets by appending if missing
-        open_sq = json_str.count('[')
-        close_sq = json_str.count(']')
-        if open_sq > close_sq:
-            json_str = json_str + (']' * (open_sq - close_sq))
-            print("Repaired missing closing square bracket(s)")
-        open_curly = json_str.count('{')
-        close_curly = json_str.count('}')
-        if open_curly > close_curly:
-            json_str = json_str + ('}' * (open_curly - close_curly))
-            print("Repaired missing closing curly brace(s)")
-
-        # Clean up the JSON string
-        # Remove any trailing commas before closing brackets
-        json_str = re.sub(r',\s*\]', ']', json_str)
-        json_str = re.sub(r',\s*\}', '}', json_str)
+        # Shards are streamed concurrently and parsed as their responses arrive
+        workers = min(max_concurrency or EXTRACTION_MAX_CONCURRENCY, len(shards))
+        with ThreadPoolExecutor(max_workers=workers) as executor:
+            shard_results = list(executor.map(
+                lambda text: _extract_shard(chain, text, chain_config), (text for text, _ in shards)
+            ))
         
-        # Try to parse JSON
-        print("\nAttempting to parse JSON...")
-        try:
-            transactions = json.loads(json_str)
-            print(f"✓ Successfully parsed JSON! Found {len(transactions)} transactions")
-        except json.JSONDecodeError as je:
-            print(f"✗ JSON parse failed: {str(je)}")
-            print(f"Error at position {je.pos if hasattr(je, 'pos') else 'unknown'}")
-            
-            # Try fixing common issues
-            print("\nAttempting to fix JSON...")
-            
-            # Fix 1: Replace single quotes with double quotes
-            json_str_fixed = json_str.replace("'", '"')
-            try:
-                transactions = json.loads(json_str_fixed)
-                print("✓ Fixed JSON by replacing single quotes")
-            except:
-                # Fix 2: Try removing trailing commas
-                json_str_fixed = re.sub(r',\s*}', '}', json_str_fixed)
-                json_str_fixed = re.sub(r',\s*\]', ']', json_str_fixed)
-                try:
-                    transactions = json.loads(json_str_fixed)
-                    print("✓ Fixed JSON by removing trailing commas")
-                except Exception as final_error:
-                    # Save problematic JSON for debugging
-                    with open("json_error_debug.txt", "w", encoding="utf-8") as f:
-                        f.write(json_str)
-                    print(f"✗ All fixes failed. Saved to json_error_debug.txt")
-                    raise ValueError(f"Failed to parse JSON after all fixes. Original error: {str(je)}. Final error: {str(final_error)}")
+        # Drop transactions repeated from the previous shard's overlapping lines
+        transactions = _merge_shard_transactions(shards, shard_results)
         
         if not transactions or len(transactions) == 0:
             raise ValueError("No transactions extracted from PDF")
@@ -224,7 +539,7 @@ Return format:
         for i, txn in enumerate(transactions):
             for field in required_fields:
                 if field not in txn:
-                    print(f"Warning: Transaction {i} missing field '{field}', adding default")
+                    logger.warning("Transaction %d missing field '%s', adding default", i, field)
                     if field == 'type':
                         txn[field] = 'debit'  # Default to debit
                     elif field == 'amount':
@@ -232,34 +547,33 @@ Return format:
                     else:
                         txn[field] = ''
         
-        state["transactions"] = transactions
-        state["extraction_method"] = "openai_llm"
-        state["processing_status"] = "llm_extracted"
+        if cache_path:
+            _store_cached_transactions(cache_path, transactions)
         
-        state["messages"] = state.get("messages", []) + [
-            AIMessage(content=f"✅ Extracted {len(transactions)} transactions from PDF using OpenAI GPT-4o-mini")
-        ]
-            
+        return {
+            "raw_text": "",
+            "transactions": transactions,
+            "extraction_method": "openai_llm",
+            "processing_status": "llm_extracted",
+            "messages": [
+                AIMessage(content=f"✅ Extracted {len(transactions)} transactions from PDF using OpenAI GPT-4o-mini")
+            ]
+        }
+    
     except json.JSONDecodeError as e:
         error_msg = f"JSON parsing error: {str(e)}"
-        print(f"\n[ERROR] {error_msg}")
-        print("Falling back to sample data...\n")
-        state["errors"] = state.get("errors", []) + [error_msg]
-        state["transactions"] = get_sample_transactions()
-        state["processing_status"] = "fallback_to_sample"
-        state["messages"] = state.get("messages", []) + [
-            AIMessage(content=f"Failed to parse LLM response as JSON, using sample data. Error: {str(e)}")
-        ]
-        
+        logger.error("%s; falling back to sample data", error_msg)
+        message = f"Failed to parse LLM response as JSON, using sample data. Error: {str(e)}"
+    
     except Exception as e:
         error_msg = f"Transaction extraction error: {str(e)}"
-        print(f"\n[ERROR] {error_msg}")
-        print("Falling back to sample data...\n")
-        state["errors"] = state.get("errors", []) + [error_msg]
-        state["transactions"] = get_sample_transactions()
-        state["processing_status"] = "fallback_to_sample"
-        state["messages"] = state.get("messages", []) + [
-            AIMessage(content=f"Failed to extract from PDF, using sample data. Check llm_response_debug.txt for details. Error: {str(e)}")
-        ]
-
-    return state
\ No newline at end of file
+        logger.error("%s; falling back to sample data", error_msg)
+        message = f"Failed to extract from PDF, using sample data. Check llm_response_debug.txt for details. Error: {str(e)}"
+    
+    return {
+        "raw_text": "",
+        "transactions": get_sample_transactions(),
+        "processing_status": "fallback_to_sample",
+        "errors": state.get("errors", []) + [error_msg],
+        "messages": [AIMessage(content=message)]
+    }
\ No newline at end of file
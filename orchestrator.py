@@ -1,16 +1,22 @@
 """
 🌱 LangGraph Orchestrator for Carbon Footprint Analysis
 
-Simple, clean orchestration of the 8-node workflow:
-PDF → Extract → Redact → Rule → LLM → Carbon → Aggregate → Insights
+Simple, clean orchestration of the 9-node workflow:
+PDF → Extract → Redact → (High-value filter ∥ Rule) → LLM → Carbon → Aggregate → Insights
 """
 
+import asyncio
 from datetime import datetime
+from functools import lru_cache
+from uuid import uuid4
 from langgraph.graph import StateGraph, END
-from langgraph.checkpoint.memory import MemorySaver
 
-from core.state import GraphState
+from core.state import GraphState, create_initial_state
+from core.checkpoint import create_checkpointer
+from core.llm_factory import prewarm_llm
+from utils.merchant_cache import MerchantCache
 from nodes import (
+    check_result_cache_node,
     parse_pdf_node,
     extract_transactions_node,
     redact_pii_node,
@@ -19,21 +25,26 @@ from nodes import (
     llm_categorization_node,
     estimate_carbon_node,
     aggregate_results_node,
-    generate_insights_node
+    generate_insights_node,
+    store_result_node
 )
+from nodes.result_cache import route_after_cache_check
+from nodes.transaction_extractor import EXTRACTION_MODEL, EXTRACTION_TEMPERATURE, EXTRACTION_MAX_TOKENS
 
 def create_carbon_footprint_graph() -> StateGraph:
     """
     Create the LangGraph workflow for carbon footprint estimation
     
-    Graph Flow (9 Nodes):
-    START → parse_pdf → extract_transactions → redact_pii → filter_high_value
-          → rule_based_categorization → llm_categorization 
-          → estimate_carbon → aggregate_results → generate_insights → END
+    Graph Flow (9 Nodes, wrapped by the result cache):
+    START → check_result_cache → (cached: END)
+          → parse_pdf → extract_transactions → redact_pii
+          → (filter_high_value ∥ rule_based_categorization) → llm_categorization 
+          → estimate_carbon → aggregate_results → generate_insights → store_result → END
     """
     workflow = StateGraph(GraphState)
     
     # Add all nodes
+    workflow.add_node("check_result_cache", check_result_cache_node)
     workflow.add_node("parse_pdf", parse_pdf_node)
     workflow.add_node("extract_transactions", extract_transactions_node)
     workflow.add_node("redact_pii", redact_pii_node)
@@ -43,23 +54,84 @@ def create_carbon_footprint_graph() -> StateGraph:
     workflow.add_node("estimate_carbon", estimate_carbon_node)
     workflow.add_node("aggregate_results", aggregate_results_node)
     workflow.add_node("generate_insights", generate_insights_node)
+    workflow.add_node("store_result", store_result_node)
     
-    # Define linear flow with new node
-    workflow.set_entry_point("parse_pdf")
+    # Define flow; high-value filtering and rule-based categorization both
+    # only read the redacted transactions, so they fan out and join before the LLM
+    workflow.set_entry_point("check_result_cache")
+    # An unchanged statement skips straight to the end with its cached result
+    workflow.add_conditional_edges(
+        "check_result_cache",
+        route_after_cache_check,
+        {"hit": END, "miss": "parse_pdf"}
+    )
     workflow.add_edge("parse_pdf", "extract_transactions")
     workflow.add_edge("extract_transactions", "redact_pii")
     workflow.add_edge("redact_pii", "filter_high_value")  # NEW EDGE
-    workflow.add_edge("filter_high_value", "rule_based_categorization")
-    workflow.add_edge("rule_based_categorization", "llm_categorization")
+    workflow.add_edge("redact_pii", "rule_based_categorization")
+    workflow.add_edge(["filter_high_value", "rule_based_categorization"], "llm_categorization")
     workflow.add_edge("llm_categorization", "estimate_carbon")
     workflow.add_edge("estimate_carbon", "aggregate_results")
     workflow.add_edge("aggregate_results", "generate_insights")
-    workflow.add_edge("generate_insights", END)
+    workflow.add_edge("generate_insights", "store_result")
+    workflow.add_edge("store_result", END)
     
     return workflow
 
+@lru_cache(maxsize=2)
+def get_compiled_graph(resumable: bool = False):
+    """
+    Compile the workflow once per checkpointing mode and reuse it across runs
+    
+    Args:
+        resumable: Compile with an in-memory checkpointer (default: False)
+    
+    Returns:
+        Compiled LangGraph application
+    """
+    # One-shot runs skip checkpointing the full state after every node;
+    # resumable runs share one saver so their thread_ids can be resumed later
+    workflow = create_carbon_footprint_graph()
+    return workflow.compile(checkpointer=create_checkpointer() if resumable else None)
+
+# Compile the default graph at import so the first request doesn't pay for it
+get_compiled_graph(False)
+
+def _build_run_config(pdf_provided: bool, password: str, llm_provider: str,
+                      llm_model: str, merchant_cache: MerchantCache,
+                      max_concurrency: int = None) -> dict:
+    """Build the LangSmith-traced run config shared by the sync and async entry points"""
+    # Thread id and timestamp share one clock read; the suffix keeps concurrent runs apart
+    started_at = datetime.now()
+    return {
+        "configurable": {
+            "thread_id": f"carbon-analysis-{started_at:%Y%m%d-%H%M%S}-{uuid4().hex[:8]}",
+            "merchant_cache": merchant_cache,
+            "max_concurrency": max_concurrency  # LLM calls in flight per node (None: node default)
+        },
+        "run_name": "carbon_footprint_analysis",
+        "tags": ["carbon-footprint", "indian-bank", "pii-redaction", llm_provider],
+        "metadata": {
+            "pdf_provided": pdf_provided,
+            "password_provided": bool(password),
+            "llm_provider": llm_provider,
+            "llm_model": llm_model or "default",
+            "timestamp": started_at.isoformat()
+        }
+    }
+
+def _prewarm_llms(pdf_provided: bool, llm_provider: str, llm_model: str) -> None:
+    """Start creating the extraction and categorization LLM clients while the PDF is parsed"""
+    # Sample-data runs never call an LLM for extraction
+    if not pdf_provided:
+        return
+    prewarm_llm("openai", EXTRACTION_MODEL, EXTRACTION_TEMPERATURE, EXTRACTION_MAX_TOKENS)
+    prewarm_llm(llm_provider, llm_model or "")
+
 def run_carbon_analysis(pdf_path: str = None, password: str = None, 
-                       llm_provider: str = "openai", llm_model: str = None) -> dict:
+                       llm_provider: str = "openai", llm_model: str = None,
+                       resumable: bool = False, pdf_bytes: bytes = None,
+                       max_concurrency: int = None) -> dict:
     """
     🚀 Main entry point to run carbon footprint analysis
     
@@ -68,64 +140,100 @@ def run_carbon_analysis(pdf_path: str = None, password: str = None,
         password: PDF password if required (optional)
         llm_provider: "openai" or "groq" (default: "openai")
         llm_model: Specific model name (optional)
+        resumable: Checkpoint state after every node so the run can be resumed (default: False)
+        pdf_bytes: PDF bank statement already in memory, used instead of pdf_path (optional)
+        max_concurrency: Maximum concurrent LLM requests for extraction shards and
+            categorization batches (optional, default: 8)
     
     Returns:
         Complete analysis results
     """
-    # Create and compile graph
-    workflow = create_carbon_footprint_graph()
-    memory = MemorySaver()
-    app = workflow.compile(checkpointer=memory)
+    # Reuse the graph compiled for this checkpointing mode
+    app = get_compiled_graph(resumable)
     
     # Initialize state
-    initial_state = {
-        "pdf_path": pdf_path or "",
-        "pdf_password": password or "",
-        "llm_provider": llm_provider,
-        "llm_model": llm_model or "",
-        "bank_type": "",
-        "extraction_method": "",
-        "raw_text": "",
-        "transactions": [],
-        "redacted_transactions": [],
-        "rule_categorized": [],
-        "uncategorized": [],
-        "categorized_transactions": [],
-        "carbon_estimates": [],
-        "total_carbon_kg_min": 0.0,
-        "total_carbon_kg_max": 0.0,
-        "total_carbon_kg_avg": 0.0,
-        "category_breakdown": {},
-        "monthly_breakdown": {},
-        "rule_based_count": 0,
-        "llm_based_count": 0,
-        "pii_redacted_count": 0,
-        "high_value_transactions": [],
-        "high_value_count": 0,
-        "recommendations": [],
-        "insights": [],
-        "messages": [],
-        "errors": [],
-        "processing_status": "initialized"
-    }
+    initial_state = create_initial_state(
+        pdf_path=pdf_path or "",
+        pdf_password=password or "",
+        llm_provider=llm_provider,
+        llm_model=llm_model or "",
+        pdf_bytes=pdf_bytes or b""
+    )
     
-    # Run with LangSmith tracing
-    config = {
-        "configurable": {"thread_id": f"carbon-analysis-{datetime.now().strftime('%Y%m%d-%H%M%S')}"},
-        "run_name": "carbon_footprint_analysis",
-        "tags": ["carbon-footprint", "indian-bank", "pii-redaction", llm_provider],
-        "metadata": {
-            "pdf_provided": bool(pdf_path),
-            "password_provided": bool(password),
-            "llm_provider": llm_provider,
-            "llm_model": llm_model or "default",
-            "timestamp": datetime.now().isoformat()
-        }
-    }
+    pdf_provided = bool(pdf_path or pdf_bytes)
+    _prewarm_llms(pdf_provided, llm_provider, llm_model)
+    
+    # Merchant categories assigned by the LLM persist across runs
+    merchant_cache = MerchantCache()
+    config = _build_run_config(
+        pdf_provided, password, llm_provider, llm_model, merchant_cache, max_concurrency
+    )
+    
+    try:
+        result = app.invoke(initial_state, config)
+    finally:
+        merchant_cache.close()
+    return result
+
+async def run_carbon_analysis_async(pdf_path: str = None, password: str = None,
+                                    llm_provider: str = "openai", llm_model: str = None,
+                                    resumable: bool = False, pdf_bytes: bytes = None,
+                                    max_concurrency: int = None) -> dict:
+    """
+    Async version of run_carbon_analysis
+    
+    The nodes are synchronous; LangGraph runs each one on a worker thread,
+    so several statements can be analyzed concurrently on one event loop.
+    
+    Args:
+        Same as run_carbon_analysis
+    
+    Returns:
+        Complete analysis results
+    """
+    app = get_compiled_graph(resumable)
+    
+    initial_state = create_initial_state(
+        pdf_path=pdf_path or "",
+        pdf_password=password or "",
+        llm_provider=llm_provider,
+        llm_model=llm_model or "",
+        pdf_bytes=pdf_bytes or b""
+    )
+    
+    pdf_provided = bool(pdf_path or pdf_bytes)
+    _prewarm_llms(pdf_provided, llm_provider, llm_model)
+    
+    merchant_cache = MerchantCache()
+    config = _build_run_config(
+        pdf_provided, password, llm_provider, llm_model, merchant_cache, max_concurrency
+    )
     
-    result = app.invoke(initial_state, config)
+    try:
+        result = await app.ainvoke(initial_state, config)
+    finally:
+        merchant_cache.close()
     return result
 
+async def run_many(pdf_paths: list, password: str = None,
+                   llm_provider: str = "openai", llm_model: str = None) -> list:
+    """
+    Analyze several bank statements concurrently
+    
+    Args:
+        pdf_paths: Paths to PDF bank statements
+        password: PDF password shared by the statements (optional)
+        llm_provider: "openai" or "groq" (default: "openai")
+        llm_model: Specific model name (optional)
+    
+    Returns:
+        Analysis results in the same order as pdf_paths
+    """
+    return await asyncio.gather(*(
+        run_carbon_analysis_async(pdf_path, password, llm_provider, llm_model)
+        for pdf_path in pdf_paths
+    ))
+
 if __name__ == "__main__":
     print("🌱 Carbon Footprint LangGraph Orchestrator")
     print("=" * 50)
@@ -10,15 +10,324 @@ import json
 import plotly.express as px
 import plotly.graph_objects as go
 import pandas as pd
-from datetime import datetime
-import tempfile
+from uuid import uuid4
+import hashlib
 import os
+from pathlib import Path
 from dotenv import load_dotenv
-load_dotenv(override=True)  # Force reload
+
+# .env is applied once per server process (overriding the shell), not on every rerun;
+# edits to it take effect after a restart
+if "_DOTENV_LOADED" not in os.environ:
+    load_dotenv(override=True)
+    os.environ["_DOTENV_LOADED"] = "1"
 
 from orchestrator import run_carbon_analysis
 from utils.reporting import generate_report
 from utils.patterns import EMISSION_FACTORS
+from utils.result_cache import RESULT_CACHE_TTL_SECONDS, is_cacheable_result
+
+APP_DIR = Path(__file__).parent
+
+@st.cache_data
+def _load_css():
+    """Read the app stylesheet once per process"""
+    return (APP_DIR / "assets" / "app.css").read_text(encoding="utf-8")
+
+# Landing page shown until an analysis has been run
+_WELCOME_MD = """
+## Welcome to the Carbon Footprint Analyzer! 🌍
+
+This tool analyzes your Indian bank statement to estimate your carbon footprint based on spending patterns.
+
+### How it works:
+
+1. **Upload** your bank statement PDF (or use sample data)
+2. **AI Extraction** structures your transactions
+3. **Rule-Based Categorization** - Fast pattern matching for known merchants
+4. **LLM Categorization** - AI handles uncertain transactions only
+5. **Carbon Calculation** estimates CO2 emissions with min/max ranges
+6. **Insights & Recommendations** help you reduce your footprint
+
+### Categorization Approach:
+
+| Method | Speed | Usage |
+|--------|-------|-------|
+| 🚀 Rule-Based | Fast | Known merchants (Swiggy, IOCL, Netflix, etc.) |
+| 🤖 LLM-Based | Slower | Uncertain/new merchants |
+
+This hybrid approach is **faster** and **more cost-effective** than pure LLM!
+
+### Categories Analyzed (with emission factors):
+
+| Category | Emission Factor (kg CO2e/₹1000) |
+|----------|--------------------------------|
+| 🚗 Transport | 20 - 40 |
+| 🏠 Housing & Utilities | 10 - 20 |
+| 🍽️ Food & Groceries | 7 - 15 |
+| 🛒 Household Appliances | 5 - 10 |
+| 👕 Clothing & Footwear | 5 - 10 |
+| 🎭 Recreation & Leisure | 2 - 8 |
+| 🏥 Healthcare | 3 - 7 |
+| 📱 Education & Communication | 1 - 5 |
+| 💰 Financial Services | 1 - 3 |
+
+### Get Started
+
+Click **"Analyze Carbon Footprint"** in the sidebar to begin!
+"""
+
+# Selectable models per LLM provider (the first one is the default)
+_PROVIDER_MODELS = {
+    "openai": (
+        "gpt-4o",
+        "gpt-4o-mini",
+        "gpt-4-turbo",
+        "gpt-3.5-turbo"
+    ),
+    "groq": (
+        "llama-3.3-70b-versatile",      # NEW: Latest Llama 3.3
+        "llama-3.1-70b-versatile",      # Current best
+        "llama-3.1-8b-instant",         # Fast option
+        "llama-3.2-90b-text-preview",   # NEW: Larger model
+        "llama-3.2-11b-text-preview",   # NEW: Mid-size
+        "llama-3.2-3b-preview",         # NEW: Smallest
+        "mixtral-8x7b-32768",           # Mixtral (still good)
+        "gemma2-9b-it",                 # Gemma (efficient)
+        "llama-guard-3-8b",             # NEW: Safety model
+    )
+}
+
+_PROVIDER_MODEL_HELP = {
+    "openai": "OpenAI models - GPT-4o is recommended for best balance",
+    "groq": "Latest Groq models - Llama 3.3 70B is recommended for best performance"
+}
+
+# In-memory analyses expire together with the on-disk result cache behind
+# run_carbon_analysis (which also drops entries when patterns or emission factors change)
+# and, like it, only keep runs that pass is_cacheable_result
+_ANALYSIS_CACHE_TTL = RESULT_CACHE_TTL_SECONDS
+
+# Rows per page of the "View All Transactions" table
+_TXN_PAGE_SIZE = 500
+
+# Statement date formats, tried in order
+_DATE_FORMATS = ('%d/%m/%Y', '%d-%m-%Y', '%d/%m/%y', '%d-%m-%y', '%Y-%m-%d')
+
+def _parse_dates(date_strings):
+    """Parse a column of date strings, trying each format on the still-unparsed rows (first match wins)"""
+    dates = pd.Series(pd.NaT, index=date_strings.index, dtype='datetime64[ns]')
+    missing = dates.isna()
+    for fmt in _DATE_FORMATS:
+        if not missing.any():
+            break
+        dates[missing] = pd.to_datetime(date_strings[missing], format=fmt, errors='coerce')
+        missing = dates.isna()
+    return dates
+
+@st.cache_resource
+def _sample_figure():
+    """Sample preview chart; identical for every session, so it is built once"""
+    # Create sample visualization with ranges
+    sample_data = {
+        'Category': ['Transport', 'Housing', 'Food', 'Appliances', 'Recreation', 'Healthcare'],
+        'CO2 Min': [50, 28, 7.7, 16, 1.3, 1.35],
+        'CO2 Max': [100, 56, 16.5, 32, 5.2, 3.15],
+        'CO2 Avg': [75, 42, 12.1, 24, 3.25, 2.25]
+    }
+    df_sample = pd.DataFrame(sample_data)
+    
+    fig_sample = go.Figure()
+    
+    fig_sample.add_trace(go.Bar(
+        name='CO2 Range',
+        x=df_sample['Category'],
+        y=df_sample['CO2 Avg'],
+        marker_color='#4CAF50',
+        error_y=dict(
+            type='data',
+            symmetric=False,
+            array=df_sample['CO2 Max'] - df_sample['CO2 Avg'],
+            arrayminus=df_sample['CO2 Avg'] - df_sample['CO2 Min'],
+            color='#1B5E20'
+        )
+    ))
+    
+    fig_sample.update_layout(
+        title='Sample Carbon Footprint by Category (with ranges)',
+        yaxis_title='CO2 Emissions (kg)',
+        showlegend=False
+    )
+    
+    return fig_sample
+
+@st.cache_resource
+def _factors_frame():
+    """Emission factors reference table; EMISSION_FACTORS is constant, so it is built once"""
+    return pd.DataFrame([
+        {
+            'Category': cat.replace('_', ' ').title(),
+            'Min (kg CO2e/₹1000)': factors['min'],
+            'Max (kg CO2e/₹1000)': factors['max'],
+            'Notes': factors.get('notes', '')
+        }
+        for cat, factors in EMISSION_FACTORS.items()
+    ])
+
+@st.cache_data
+def _efficiency_figure(rule_count, llm_count):
+    """Rule-based vs LLM categorization donut chart"""
+    fig_efficiency = go.Figure(data=[go.Pie(
+        labels=['Rule-Based', 'LLM-Based'],
+        values=[rule_count, llm_count],
+        hole=.4,
+        marker_colors=['#4CAF50', '#FF9800']
+    )])
+    fig_efficiency.update_layout(
+        title_text="Categorization Method Distribution",
+        height=300
+    )
+    return fig_efficiency
+
+@st.cache_data(max_entries=8)
+def _estimates_frame(analysis_id, _carbon_estimates):
+    """One flat table of the carbon estimates, shared by the timeline and the transactions table"""
+    # Handle both nested and flat transaction structures (all estimates of a run share one)
+    first_est = _carbon_estimates[0] if _carbon_estimates else {}
+    if isinstance(first_est.get('transaction'), dict) and 'transaction' in first_est['transaction']:
+        txns = [est['transaction']['transaction'] for est in _carbon_estimates]
+        labels = [est['transaction'] for est in _carbon_estimates]
+    else:
+        # Flat structure - transaction fields directly in estimate
+        txns = labels = _carbon_estimates
+    
+    return pd.DataFrame({
+        'date': [txn.get('date', '') for txn in txns],
+        'description': [txn.get('description', '') for txn in txns],
+        'amount': [txn.get('amount', 0) for txn in txns],
+        'type': [txn.get('type', '') for txn in txns],
+        'category': [label.get('category', 'miscellaneous') for label in labels],
+        'method': [label.get('categorization_method', 'unknown') for label in labels],
+        'co2_min': [est.get('carbon_kg_min', 0) for est in _carbon_estimates],
+        'co2_max': [est.get('carbon_kg_max', 0) for est in _carbon_estimates],
+        'co2_avg': [est.get('carbon_kg_avg', 0) for est in _carbon_estimates]
+    })
+
+@st.cache_data(max_entries=8)
+def _category_frame(analysis_id, _category_breakdown):
+    """One numeric table of the category breakdown, shared by the pie, range chart and details table"""
+    categories = list(_category_breakdown)
+    data = list(_category_breakdown.values())
+    return pd.DataFrame({
+        'Category': [cat.replace('_', ' ').title() for cat in categories],
+        'Transactions': [d['count'] for d in data],
+        'Spend (₹)': [d['amount_spent'] for d in data],
+        'CO2 Min (kg)': [d['min'] for d in data],
+        'CO2 Max (kg)': [d['max'] for d in data],
+        'CO2 Avg (kg)': [d['avg'] for d in data],
+        'Factor (kg/₹1000)': [f"{d['emission_factor_min']}-{d['emission_factor_max']}" for d in data]
+    })
+
+@st.cache_data(max_entries=8)
+def _category_figures(analysis_id, _df_positive):
+    """Category pie and min/max range charts for one analysis (categories with positive CO2 only)"""
+    fig_pie = px.pie(
+        _df_positive, 
+        values='CO2 Avg (kg)', 
+        names='Category',
+        color_discrete_sequence=px.colors.sequential.Greens_r
+    )
+    fig_pie.update_traces(textposition='inside', textinfo='percent+label')
+    
+    df_bar = _df_positive.sort_values('CO2 Avg (kg)', ascending=True)
+    
+    # Error bar lengths as plain arrays (no index alignment needed)
+    co2_avg = df_bar['CO2 Avg (kg)'].to_numpy()
+    co2_plus = df_bar['CO2 Max (kg)'].to_numpy() - co2_avg
+    co2_minus = co2_avg - df_bar['CO2 Min (kg)'].to_numpy()
+    
+    # Create bar chart with error bars for min/max
+    fig_range = go.Figure()
+    
+    # Add bars for average with error bars
+    fig_range.add_trace(go.Bar(
+        name='CO2 Emissions',
+        y=df_bar['Category'].to_numpy(),
+        x=co2_avg,
+        orientation='h',
+        marker_color='#4CAF50',
+        error_x=dict(
+            type='data',
+            symmetric=False,
+            array=co2_plus,
+            arrayminus=co2_minus,
+            color='#1B5E20'
+        )
+    ))
+    
+    fig_range.update_layout(
+        height=400,
+        xaxis_title="CO2 Emissions (kg)",
+        showlegend=False
+    )
+    return fig_pie, fig_range
+
+@st.cache_data(max_entries=8)
+def _json_report(analysis_id, _result):
+    """JSON download for one analysis (the result itself is not hashed; analysis_id identifies it)"""
+    json_result = {
+        "total_carbon_kg_min": _result["total_carbon_kg_min"],
+        "total_carbon_kg_max": _result["total_carbon_kg_max"],
+        "total_carbon_kg_avg": _result["total_carbon_kg_avg"],
+        "rule_based_count": _result.get("rule_based_count", 0),
+        "llm_based_count": _result.get("llm_based_count", 0),
+        "category_breakdown": _result["category_breakdown"],
+        "monthly_breakdown": _result["monthly_breakdown"],
+        "insights": _result["insights"],
+        "recommendations": _result["recommendations"]
+    }
+    return json.dumps(json_result, indent=2)
+
+@st.cache_data(max_entries=8)
+def _text_report(analysis_id, _result):
+    """Text download for one analysis"""
+    return generate_report(_result)
+
+class _UncachedAnalysis(Exception):
+    """Carries an analysis with errors out of _cached_analysis (exceptions are not memoized)"""
+    def __init__(self, result):
+        super().__init__("analysis finished with errors")
+        self.result = result
+
+@st.cache_data(show_spinner=False, ttl=_ANALYSIS_CACHE_TTL, max_entries=32)
+def _cached_analysis(file_hash, _uploaded_file, pdf_password, llm_provider, llm_model, use_sample):
+    """Run the analysis once per statement content, password and model choice"""
+    if use_sample:
+        result = run_carbon_analysis(
+            llm_provider=llm_provider,
+            llm_model=llm_model
+        )
+    else:
+        # The upload is already in memory, so its bytes go straight to the parser
+        # (the file object is excluded from the cache key; file_hash stands in for it)
+        result = run_carbon_analysis(
+            pdf_bytes=_uploaded_file.getvalue(),
+            password=pdf_password,
+            llm_provider=llm_provider,
+            llm_model=llm_model
+        )
+    
+    # Failed and fallback runs are retried on the next click instead of being memoized
+    if not is_cacheable_result(result):
+        raise _UncachedAnalysis(result)
+    return result
+
+def _run_analysis(file_hash, uploaded_file, pdf_password, llm_provider, llm_model, use_sample):
+    """Cached analysis, or a fresh uncached one when the run had errors"""
+    try:
+        return _cached_analysis(file_hash, uploaded_file, pdf_password, llm_provider, llm_model, use_sample)
+    except _UncachedAnalysis as uncached:
+        return uncached.result
 
 # Page config
 st.set_page_config(
@@ -28,50 +337,7 @@ st.set_page_config(
 )
 
 # Custom CSS
-st.markdown("""
-<style>
-    .main-header {
-        font-size: 2.5rem;
-        color: #2E7D32;
-        text-align: center;
-        margin-bottom: 2rem;
-    }
-    .metric-card {
-        background-color: #f0f2f6;
-        padding: 1rem;
-        border-radius: 0.5rem;
-        text-align: center;
-    }
-    .insight-box {
-        background-color: #ffffff;
-        color: #1a1a1a;
-        padding: 1rem;
-        border-radius: 8px;
-        margin: 0.5rem 0;
-        border: 1px solid #cfd8dc;
-        box-shadow: 0 1px 2px rgba(0,0,0,0.05);
-    }
-    .recommendation-box {
-        background-color: #fffef6;
-        color: #1a1a1a;
-        padding: 1rem;
-        border-radius: 8px;
-        margin: 0.5rem 0;
-        border: 1px solid #ffe0b2;
-        box-shadow: 0 1px 2px rgba(0,0,0,0.05);
-    }
-    .range-indicator {
-        font-size: 0.8rem;
-        color: #666;
-    }
-    .efficiency-box {
-        background-color: #fff3e0;
-        padding: 1rem;
-        border-radius: 0.5rem;
-        margin: 0.5rem 0;
-    }
-</style>
-""", unsafe_allow_html=True)
+st.markdown(f"<style>{_load_css()}</style>", unsafe_allow_html=True)
 
 # Header
 st.markdown('<h1 class="main-header">🌱 Carbon Footprint Analyzer</h1>', unsafe_allow_html=True)
@@ -83,41 +349,18 @@ st.sidebar.header("⚙️ Configuration")
 # LLM Provider Selection
 llm_provider = st.sidebar.selectbox(
     "🤖 LLM Provider",
-    options=["openai", "groq"],
+    options=tuple(_PROVIDER_MODELS),
     index=0,
     help="Choose between OpenAI GPT or Groq models"
 )
 
 # Model Selection based on provider
-if llm_provider == "openai":
-    llm_model = st.sidebar.selectbox(
-        "🧠 Model",
-        options=[
-            "gpt-4o",
-            "gpt-4o-mini",
-            "gpt-4-turbo",
-            "gpt-3.5-turbo"
-        ],
-        index=0,
-        help="OpenAI models - GPT-4o is recommended for best balance"
-    )
-elif llm_provider == "groq":
-    llm_model = st.sidebar.selectbox(
-        "🧠 Model", 
-        options=[
-            "llama-3.3-70b-versatile",      # NEW: Latest Llama 3.3
-            "llama-3.1-70b-versatile",      # Current best
-            "llama-3.1-8b-instant",         # Fast option
-            "llama-3.2-90b-text-preview",   # NEW: Larger model
-            "llama-3.2-11b-text-preview",   # NEW: Mid-size
-            "llama-3.2-3b-preview",         # NEW: Smallest
-            "mixtral-8x7b-32768",           # Mixtral (still good)
-            "gemma2-9b-it",                 # Gemma (efficient)
-            "llama-guard-3-8b",             # NEW: Safety model
-        ],
-        index=0,
-        help="Latest Groq models - Llama 3.3 70B is recommended for best performance"
-    )
+llm_model = st.sidebar.selectbox(
+    "🧠 Model",
+    options=_PROVIDER_MODELS[llm_provider],
+    index=0,
+    help=_PROVIDER_MODEL_HELP[llm_provider]
+)
 
 # Show API key requirements
 if llm_provider == "openai":
@@ -162,49 +405,100 @@ if analyze_button:
         st.error("❌ Please set GROQ_API_KEY in your .env file")
         st.stop()
     
-    with st.spinner(f"Analyzing using {llm_provider.title()} {llm_model}..."):
-        try:
-            if use_sample:
-                st.info(f"📋 Using sample data with {llm_provider.title()} {llm_model}")
-                result = run_carbon_analysis(
-                    llm_provider=llm_provider,
-                    llm_model=llm_model
-                )
-            else:
-                if uploaded_file:
-                    # Save uploaded file temporarily
-                    temp_path = f"temp_{uploaded_file.name}"
-                    with open(temp_path, "wb") as f:
-                        f.write(uploaded_file.getbuffer())
-                    
-                    st.info(f"📄 Analyzing {uploaded_file.name} with {llm_provider.title()} {llm_model}")
-                    result = run_carbon_analysis(
-                        pdf_path=temp_path,
-                        password=pdf_password,
-                        llm_provider=llm_provider,
-                        llm_model=llm_model
+    # Everything that determines the result; getbuffer() is a view of the upload, so hashing it copies nothing
+    if use_sample:
+        file_hash = "sample"
+    elif uploaded_file:
+        file_hash = hashlib.sha256(uploaded_file.getbuffer()).hexdigest()
+    else:
+        st.warning("Please upload a PDF file or use sample data")
+        st.stop()
+    analysis_input = (file_hash, pdf_password, llm_provider, llm_model, use_sample)
+    
+    previous_result = st.session_state.get('analysis_result') or {}
+    if (st.session_state.get('analysis_complete') and analysis_input == st.session_state.get('analysis_input')
+            and is_cacheable_result(previous_result)):
+        # Repeat click with unchanged inputs: keep the result (and its cached tables) on screen;
+        # a run with errors is retried instead
+        st.toast("Showing the existing analysis (inputs unchanged)")
+    else:
+        with st.spinner(f"Analyzing using {llm_provider.title()} {llm_model}..."):
+            try:
+                # Repeat analyses of the same statement and model come from the cache
+                if use_sample:
+                    st.info(f"📋 Using sample data with {llm_provider.title()} {llm_model}")
+                    result = _run_analysis(
+                        file_hash, None, None, llm_provider, llm_model, use_sample=True
                     )
-                    
-                    # Clean up temp file
-                    try:
-                        os.remove(temp_path)
-                    except:
-                        pass
                 else:
-                    st.warning("Please upload a PDF file or use sample data")
-                    st.stop()
-            
-            # Store results
-            st.session_state['analysis_result'] = result
-            st.session_state['analysis_complete'] = True
-            
-        except Exception as e:
-            st.error(f"Analysis failed: {str(e)}")
-            st.session_state['analysis_complete'] = False
+                    st.info(f"📄 Analyzing {uploaded_file.name} with {llm_provider.title()} {llm_model}")
+                    result = _run_analysis(
+                        file_hash, uploaded_file, pdf_password, llm_provider, llm_model, use_sample=False
+                    )
+                
+                # Store results
+                st.session_state['analysis_result'] = result
+                st.session_state['analysis_id'] = uuid4().hex  # Keys the per-analysis cached tables and reports
+                st.session_state['analysis_input'] = analysis_input
+                st.session_state['analysis_complete'] = True
+                
+            except Exception as e:
+                st.error(f"Analysis failed: {str(e)}")
+                st.session_state['analysis_complete'] = False
+
+@st.fragment
+def _render_transactions(result, df_estimates):
+    """All-transactions table; paging through it reruns only this table"""
+    with st.expander("📝 View All Transactions"):
+        high_value_txns = result.get('high_value_transactions', [])
+        
+        # Regular transactions with carbon estimates, then high-value transactions
+        # (excluded from carbon analysis); numbers are formatted by the table itself
+        df_txn = pd.DataFrame({
+            'Date': df_estimates['date'].tolist() + [hv.get('date', '') for hv in high_value_txns],
+            'Description': df_estimates['description'].tolist() + [hv.get('description', '') for hv in high_value_txns],
+            'Amount': df_estimates['amount'].tolist() + [hv.get('amount', 0) for hv in high_value_txns],
+            'Type': df_estimates['type'].tolist() + ['debit'] * len(high_value_txns),
+            'Category': df_estimates['category'].tolist() + ['⚠️ High-Value (Excluded)'] * len(high_value_txns),
+            'Method': df_estimates['method'].tolist() + ['not_categorized'] * len(high_value_txns),
+            'CO2 Min': df_estimates['co2_min'].tolist() + [None] * len(high_value_txns),
+            'CO2 Max': df_estimates['co2_max'].tolist() + [None] * len(high_value_txns),
+            'CO2 Avg': df_estimates['co2_avg'].tolist() + [None] * len(high_value_txns)
+        })
+        for column in ('Type', 'Category', 'Method'):
+            df_txn[column] = df_txn[column].astype(str).str.replace('_', ' ').str.title()
+        
+        # Long statements are shown a page at a time, so only those rows go to the browser
+        if len(df_txn) > _TXN_PAGE_SIZE:
+            page_count = -(-len(df_txn) // _TXN_PAGE_SIZE)
+            page = st.number_input(
+                f"Page (of {page_count}, {_TXN_PAGE_SIZE} rows each)",
+                min_value=1,
+                max_value=page_count,
+                value=1,
+                step=1
+            )
+            df_txn = df_txn.iloc[(page - 1) * _TXN_PAGE_SIZE:page * _TXN_PAGE_SIZE]
+        
+        st.dataframe(
+            df_txn,
+            use_container_width=True,
+            hide_index=True,
+            column_config={
+                'Amount': st.column_config.NumberColumn('Amount', format='₹%d'),
+                'CO2 Min': st.column_config.NumberColumn('CO2 Min', format='%.3f'),
+                'CO2 Max': st.column_config.NumberColumn('CO2 Max', format='%.3f'),
+                'CO2 Avg': st.column_config.NumberColumn('CO2 Avg', format='%.3f')
+            }
+        )
 
 # Display results
-if st.session_state.get('analysis_complete', False):
+@st.fragment
+def _render_results():
+    """Results of the last analysis; reruns on its own (e.g. after a download click) without the rest of the page"""
     result = st.session_state['analysis_result']
+    analysis_id = st.session_state.get('analysis_id', '')
+    df_estimates = _estimates_frame(analysis_id, result['carbon_estimates'])
 
     # Show data source and any errors
     processing_status = result.get('processing_status', 'unknown')
@@ -224,8 +518,8 @@ if st.session_state.get('analysis_complete', False):
     elif processing_status in ['transactions_extracted', 'completed']:
         st.success("📄 **Data Source:** Your uploaded PDF bank statement")
 
-    # Show transaction count breakdown
-    total_txns = len(result.get('transactions', []))
+    # Show transaction count breakdown (cached results don't carry the extracted transactions)
+    total_txns = result.get('debits_processed_count', 0) + result.get('credits_filtered_count', 0)
     debit_txns = len(result.get('carbon_estimates', []))
     credit_txns = total_txns - debit_txns
 
@@ -274,44 +568,22 @@ if st.session_state.get('analysis_complete', False):
     st.header("📈 Emissions Timeline (Weekly)")
     
     # Prepare timeline data from transactions
-    timeline_data = []
-    for est in result['carbon_estimates']:
-        # Handle both nested and flat transaction structures
-        if 'transaction' in est and isinstance(est['transaction'], dict) and 'transaction' in est['transaction']:
-            txn = est['transaction']['transaction']
-            category = est['transaction']['category']
-        else:
-            txn = est
-            category = est.get('category', 'miscellaneous')
-        
-        date_str = txn.get('date', '')
-        try:
-            # Try multiple date formats
-            for fmt in ['%d/%m/%Y', '%d-%m-%Y', '%d/%m/%y', '%d-%m-%y', '%Y-%m-%d']:
-                try:
-                    date_obj = datetime.strptime(date_str, fmt)
-                    break
-                except:
-                    continue
-            else:
-                continue  # Skip if date parsing fails
-            
-            timeline_data.append({
-                'Date': date_obj,
-                'Category': category.replace('_', ' ').title(),
-                'CO2_Min': est.get('carbon_kg_min', 0),
-                'CO2_Max': est.get('carbon_kg_max', 0),
-                'CO2_Avg': est.get('carbon_kg_avg', 0)
-            })
-        except:
-            pass  # Skip transactions with invalid dates
-    
-    if timeline_data:
-        df_timeline = pd.DataFrame(timeline_data)
+    df_timeline = df_estimates[['date', 'category', 'co2_min', 'co2_max', 'co2_avg']].rename(columns={
+        'date': 'date_str',
+        'category': 'Category',
+        'co2_min': 'CO2_Min',
+        'co2_max': 'CO2_Max',
+        'co2_avg': 'CO2_Avg'
+    })
+    df_timeline['Date'] = _parse_dates(df_timeline['date_str'])
+    df_timeline = df_timeline.dropna(subset=['Date'])  # Skip transactions with invalid dates
+    
+    if not df_timeline.empty:
+        df_timeline['Category'] = df_timeline['Category'].str.replace('_', ' ').str.title()
         df_timeline = df_timeline.sort_values('Date')
         
         # Group by week
-        df_timeline['Week'] = df_timeline['Date'].dt.to_period('W').apply(lambda r: r.start_time)
+        df_timeline['Week'] = df_timeline['Date'].dt.to_period('W').dt.start_time
         
         # Aggregate by week
         weekly_totals = df_timeline.groupby('Week').agg({
@@ -416,29 +688,26 @@ if st.session_state.get('analysis_complete', False):
             """)
         
         with tab2:
-            # Stacked area chart by category
-            fig_stacked = go.Figure()
-            
-            # Get unique categories
-            categories = weekly_by_category['Category'].unique()
-            colors = px.colors.qualitative.Set2
-            
-            for i, category in enumerate(categories):
-                cat_data = weekly_by_category[weekly_by_category['Category'] == category]
-                fig_stacked.add_trace(go.Scatter(
-                    x=cat_data['Week'],
-                    y=cat_data['CO2_Avg'],
-                    name=category,
-                    mode='lines',
-                    stackgroup='one',
-                    fillcolor=colors[i % len(colors)],
-                    hovertemplate='%{fullData.name}<br>CO2: %{y:.2f} kg<extra></extra>'
-                ))
+            # Stacked area chart by category (one trace per category, built in a single call);
+            # a fixed category order keeps each category's color independent of which week it first appears in
+            fig_stacked = px.area(
+                weekly_by_category,
+                x='Week',
+                y='CO2_Avg',
+                color='Category',
+                category_orders={'Category': sorted(weekly_by_category['Category'].unique())},
+                color_discrete_sequence=px.colors.qualitative.Set2
+            )
+            fig_stacked.update_traces(
+                mode='lines',
+                hovertemplate='%{fullData.name}<br>CO2: %{y:.2f} kg<extra></extra>'
+            )
             
             fig_stacked.update_layout(
                 title='Weekly Emissions by Category (Stacked)',
                 xaxis_title='Week',
                 yaxis_title='CO2 Emissions (kg)',
+                legend_title_text='',
                 hovermode='x unified',
                 height=400
             )
@@ -459,18 +728,22 @@ For large purchases (electronics, vehicles, property, investments), **activity-b
 """)
         
         with st.expander("📋 View High-Value Transactions", expanded=True):
-            hv_data = []
-            for txn in high_value_txns:
-                hv_data.append({
-                    'Description': txn.get('description', ''),
-                    'Amount': f"₹{txn.get('amount', 0):,.0f}",
-                    'Category': 'Not Categorized',  # Fixed: Don't access txn['category']
-                    'Estimated CO2 (kg)': 'N/A - Use Activity-Based',
-                    'Recommendation': 'Use activity-based estimation'
-                })
-            
-            df_hv = pd.DataFrame(hv_data)
-            st.dataframe(df_hv, use_container_width=True, hide_index=True)
+            # Amounts stay numeric (sortable); the column config formats them
+            df_hv = pd.DataFrame({
+                'Description': [txn.get('description', '') for txn in high_value_txns],
+                'Amount': [txn.get('amount', 0) for txn in high_value_txns],
+                'Category': 'Not Categorized',  # Fixed: Don't access txn['category']
+                'Estimated CO2 (kg)': 'N/A - Use Activity-Based',
+                'Recommendation': 'Use activity-based estimation'
+            })
+            st.dataframe(
+                df_hv,
+                use_container_width=True,
+                hide_index=True,
+                column_config={
+                    'Amount': st.column_config.NumberColumn('Amount', format='₹%.0f')
+                }
+            )
             
             st.markdown("""
 **Why activity-based estimation?**
@@ -488,9 +761,10 @@ For large purchases (electronics, vehicles, property, investments), **activity-b
     
     rule_count = result.get('rule_based_count', 0)
     llm_count = result.get('llm_based_count', 0)
+    cache_hits = result.get('merchant_cache_hits', 0)
     total_count = rule_count + llm_count
     
-    col_eff1, col_eff2, col_eff3 = st.columns(3)
+    col_eff1, col_eff2, col_eff3, col_eff4 = st.columns(4)
     
     with col_eff1:
         st.metric(
@@ -507,6 +781,13 @@ For large purchases (electronics, vehicles, property, investments), **activity-b
         )
     
     with col_eff3:
+        st.metric(
+            label="Merchant Cache Hits",
+            value=f"{cache_hits} txns",
+            delta=f"{(cache_hits/llm_count*100):.0f}% of LLM-path" if llm_count > 0 else None
+        )
+    
+    with col_eff4:
         st.metric(
             label="Total Processed",
             value=f"{total_count} txns"
@@ -514,47 +795,23 @@ For large purchases (electronics, vehicles, property, investments), **activity-b
     
     # Efficiency visualization
     if total_count > 0:
-        fig_efficiency = go.Figure(data=[go.Pie(
-            labels=['Rule-Based', 'LLM-Based'],
-            values=[rule_count, llm_count],
-            hole=.4,
-            marker_colors=['#4CAF50', '#FF9800']
-        )])
-        fig_efficiency.update_layout(
-            title_text="Categorization Method Distribution",
-            height=300
-        )
-        st.plotly_chart(fig_efficiency, use_container_width=True)
+        st.plotly_chart(_efficiency_figure(rule_count, llm_count), use_container_width=True)
     
     st.markdown("---")
     
     # Charts
+    df_category = _category_frame(analysis_id, result['category_breakdown'])
+    df_positive = df_category[df_category['CO2 Avg (kg)'] > 0]
+    
     col_left, col_right = st.columns(2)
     
+    if not df_positive.empty:
+        fig_pie, fig_range = _category_figures(analysis_id, df_positive)
+    
     with col_left:
         st.subheader("🥧 Carbon by Category (Average)")
         
-        # Prepare data for pie chart
-        category_data = []
-        for cat, data in result['category_breakdown'].items():
-            if data['total_co2_kg_avg'] > 0:
-                category_data.append({
-                    'Category': cat.replace('_', ' ').title(),
-                    'CO2 Min (kg)': data['total_co2_kg_min'],
-                    'CO2 Max (kg)': data['total_co2_kg_max'],
-                    'CO2 Avg (kg)': data['total_co2_kg_avg'],
-                    'Spend (₹)': data['total_spend']
-                })
-        
-        if category_data:
-            df_cat = pd.DataFrame(category_data)
-            fig_pie = px.pie(
-                df_cat, 
-                values='CO2 Avg (kg)', 
-                names='Category',
-                color_discrete_sequence=px.colors.sequential.Greens_r
-            )
-            fig_pie.update_traces(textposition='inside', textinfo='percent+label')
+        if not df_positive.empty:
             st.plotly_chart(fig_pie, use_container_width=True)
         else:
             st.info("No carbon-emitting transactions found")
@@ -562,34 +819,7 @@ For large purchases (electronics, vehicles, property, investments), **activity-b
     with col_right:
         st.subheader("📊 Carbon Range by Category")
         
-        if category_data:
-            df_bar = pd.DataFrame(category_data)
-            df_bar = df_bar.sort_values('CO2 Avg (kg)', ascending=True)
-            
-            # Create bar chart with error bars for min/max
-            fig_range = go.Figure()
-            
-            # Add bars for average with error bars
-            fig_range.add_trace(go.Bar(
-                name='CO2 Emissions',
-                y=df_bar['Category'],
-                x=df_bar['CO2 Avg (kg)'],
-                orientation='h',
-                marker_color='#4CAF50',
-                error_x=dict(
-                    type='data',
-                    symmetric=False,
-                    array=df_bar['CO2 Max (kg)'] - df_bar['CO2 Avg (kg)'],
-                    arrayminus=df_bar['CO2 Avg (kg)'] - df_bar['CO2 Min (kg)'],
-                    color='#1B5E20'
-                )
-            ))
-            
-            fig_range.update_layout(
-                height=400,
-                xaxis_title="CO2 Emissions (kg)",
-                showlegend=False
-            )
+        if not df_positive.empty:
             st.plotly_chart(fig_range, use_container_width=True)
     
     st.markdown("---")
@@ -597,23 +827,20 @@ For large purchases (electronics, vehicles, property, investments), **activity-b
     # Detailed breakdown table
     st.subheader("📋 Category Details")
     
-    table_data = []
-    for cat, data in result['category_breakdown'].items():
-        if data['total_co2_kg_avg'] > 0 or data['total_spend'] > 0:
-            table_data.append({
-                'Category': cat.replace('_', ' ').title(),
-                'Transactions': data['count'],
-                'Total Spend (₹)': f"₹{data['total_spend']:,.0f}",
-                'CO2 Min (kg)': f"{data['total_co2_kg_min']:.2f}",
-                'CO2 Max (kg)': f"{data['total_co2_kg_max']:.2f}",
-                'CO2 Avg (kg)': f"{data['total_co2_kg_avg']:.2f}",
-                'Factor (kg/₹1000)': f"{data['emission_factor_min']}-{data['emission_factor_max']}"
-            })
-    
-    if table_data:
-        df_table = pd.DataFrame(table_data)
-        df_table = df_table.sort_values('CO2 Avg (kg)', ascending=False)
-        st.dataframe(df_table, use_container_width=True, hide_index=True)
+    df_table = df_category[(df_category['CO2 Avg (kg)'] > 0) | (df_category['Spend (₹)'] > 0)]
+    if not df_table.empty:
+        # Numeric columns sort by value; formatting is left to the column config
+        st.dataframe(
+            df_table.sort_values('CO2 Avg (kg)', ascending=False),
+            use_container_width=True,
+            hide_index=True,
+            column_config={
+                'Spend (₹)': st.column_config.NumberColumn('Total Spend (₹)', format='₹%.0f'),
+                'CO2 Min (kg)': st.column_config.NumberColumn('CO2 Min (kg)', format='%.2f'),
+                'CO2 Max (kg)': st.column_config.NumberColumn('CO2 Max (kg)', format='%.2f'),
+                'CO2 Avg (kg)': st.column_config.NumberColumn('CO2 Avg (kg)', format='%.2f')
+            }
+        )
     
     st.markdown("---")
     
@@ -621,17 +848,7 @@ For large purchases (electronics, vehicles, property, investments), **activity-b
     with st.expander("📚 Emission Factors Reference"):
         st.markdown("**Based on NSSO-linked studies and Indian GHG inventory research**")
         
-        factors_data = []
-        for cat, factors in EMISSION_FACTORS.items():
-            factors_data.append({
-                'Category': cat.replace('_', ' ').title(),
-                'Min (kg CO2e/₹1000)': factors['min'],
-                'Max (kg CO2e/₹1000)': factors['max'],
-                'Notes': factors.get('notes', '')
-            })
-        
-        df_factors = pd.DataFrame(factors_data)
-        st.dataframe(df_factors, use_container_width=True, hide_index=True)
+        st.dataframe(_factors_frame(), use_container_width=True, hide_index=True)
     
     st.markdown("---")
     
@@ -657,50 +874,7 @@ For large purchases (electronics, vehicles, property, investments), **activity-b
     st.markdown("---")
     
     # Transaction details (expandable)
-    with st.expander("📝 View All Transactions"):
-        txn_data = []
-        
-        # Add regular transactions with carbon estimates
-        for est in result['carbon_estimates']:
-            # Handle both nested and flat transaction structures
-            if 'transaction' in est and isinstance(est['transaction'], dict) and 'transaction' in est['transaction']:
-                txn = est['transaction']['transaction']
-                category = est['transaction']['category']
-                method = est['transaction'].get('categorization_method', 'unknown')
-            else:
-                # Flat structure - transaction fields directly in estimate
-                txn = est
-                category = est.get('category', 'unknown')
-                method = est.get('categorization_method', 'unknown')
-            
-            txn_data.append({
-                'Date': txn.get('date', ''),
-                'Description': txn.get('description', ''),
-                'Amount': f"₹{txn.get('amount', 0):,.0f}",
-                'Type': txn.get('type', '').title(),
-                'Category': category.replace('_', ' ').title(),
-                'Method': method.replace('_', ' ').title(),
-                'CO2 Min': f"{est.get('carbon_kg_min', 0):.3f}",
-                'CO2 Max': f"{est.get('carbon_kg_max', 0):.3f}",
-                'CO2 Avg': f"{est.get('carbon_kg_avg', 0):.3f}"
-            })
-        
-        # Add high-value transactions (excluded from carbon analysis)
-        for hv_txn in result.get('high_value_transactions', []):
-            txn_data.append({
-                'Date': hv_txn.get('date', ''),
-                'Description': hv_txn.get('description', ''),
-                'Amount': f"₹{hv_txn.get('amount', 0):,.0f}",
-                'Type': 'Debit',
-                'Category': '⚠️ High-Value (Excluded)',
-                'Method': 'Not Categorized',
-                'CO2 Min': 'N/A',
-                'CO2 Max': 'N/A',
-                'CO2 Avg': 'N/A'
-            })
-        
-        df_txn = pd.DataFrame(txn_data)
-        st.dataframe(df_txn, use_container_width=True, hide_index=True)
+    _render_transactions(result, df_estimates)
     
     # Download options
     st.markdown("---")
@@ -708,116 +882,36 @@ For large purchases (electronics, vehicles, property, investments), **activity-b
     
     col_dl1, col_dl2 = st.columns(2)
     
+    # Report strings are built once per analysis, not on every rerun
     with col_dl1:
         # Download as JSON
-        json_result = {
-            "total_carbon_kg_min": result["total_carbon_kg_min"],
-            "total_carbon_kg_max": result["total_carbon_kg_max"],
-            "total_carbon_kg_avg": result["total_carbon_kg_avg"],
-            "rule_based_count": result.get("rule_based_count", 0),
-            "llm_based_count": result.get("llm_based_count", 0),
-            "category_breakdown": result["category_breakdown"],
-            "monthly_breakdown": result["monthly_breakdown"],
-            "insights": result["insights"],
-            "recommendations": result["recommendations"]
-        }
         st.download_button(
             label="📄 Download JSON Report",
-            data=json.dumps(json_result, indent=2),
+            data=_json_report(analysis_id, result),
             file_name="carbon_footprint_report.json",
             mime="application/json"
         )
     
     with col_dl2:
         # Download as text report
-        text_report = generate_report(result)
         st.download_button(
             label="📝 Download Text Report",
-            data=text_report,
+            data=_text_report(analysis_id, result),
             file_name="carbon_footprint_report.txt",
             mime="text/plain"
         )
 
+if st.session_state.get('analysis_complete', False):
+    _render_results()
 else:
     # Welcome message
-    st.markdown("""
-    ## Welcome to the Carbon Footprint Analyzer! 🌍
-    
-    This tool analyzes your Indian bank statement to estimate your carbon footprint based on spending patterns.
-    
-    ### How it works:
-    
-    1. **Upload** your bank statement PDF (or use sample data)
-    2. **AI Extraction** structures your transactions
-    3. **Rule-Based Categorization** - Fast pattern matching for known merchants
-    4. **LLM Categorization** - AI handles uncertain transactions only
-    5. **Carbon Calculation** estimates CO2 emissions with min/max ranges
-    6. **Insights & Recommendations** help you reduce your footprint
-    
-    ### Categorization Approach:
-    
-    | Method | Speed | Usage |
-    |--------|-------|-------|
-    | 🚀 Rule-Based | Fast | Known merchants (Swiggy, IOCL, Netflix, etc.) |
-    | 🤖 LLM-Based | Slower | Uncertain/new merchants |
-    
-    This hybrid approach is **faster** and **more cost-effective** than pure LLM!
-    
-    ### Categories Analyzed (with emission factors):
-    
-    | Category | Emission Factor (kg CO2e/₹1000) |
-    |----------|--------------------------------|
-    | 🚗 Transport | 20 - 40 |
-    | 🏠 Housing & Utilities | 10 - 20 |
-    | 🍽️ Food & Groceries | 7 - 15 |
-    | 🛒 Household Appliances | 5 - 10 |
-    | 👕 Clothing & Footwear | 5 - 10 |
-    | 🎭 Recreation & Leisure | 2 - 8 |
-    | 🏥 Healthcare | 3 - 7 |
-    | 📱 Education & Communication | 1 - 5 |
-    | 💰 Financial Services | 1 - 3 |
-    
-    ### Get Started
-    
-    Click **"Analyze Carbon Footprint"** in the sidebar to begin!
-    """)
+    st.markdown(_WELCOME_MD)
     
     # Show sample output preview
     st.markdown("---")
     st.subheader("📈 Sample Analysis Preview")
     
-    # Create sample visualization with ranges
-    sample_data = {
-        'Category': ['Transport', 'Housing', 'Food', 'Appliances', 'Recreation', 'Healthcare'],
-        'CO2 Min': [50, 28, 7.7, 16, 1.3, 1.35],
-        'CO2 Max': [100, 56, 16.5, 32, 5.2, 3.15],
-        'CO2 Avg': [75, 42, 12.1, 24, 3.25, 2.25]
-    }
-    df_sample = pd.DataFrame(sample_data)
-    
-    fig_sample = go.Figure()
-    
-    fig_sample.add_trace(go.Bar(
-        name='CO2 Range',
-        x=df_sample['Category'],
-        y=df_sample['CO2 Avg'],
-        marker_color='#4CAF50',
-        error_y=dict(
-            type='data',
-            symmetric=False,
-            array=df_sample['CO2 Max'] - df_sample['CO2 Avg'],
-            arrayminus=df_sample['CO2 Avg'] - df_sample['CO2 Min'],
-            color='#1B5E20'
-        )
-    ))
-    
-    fig_sample.update_layout(
-        title='Sample Carbon Footprint by Category (with ranges)',
-        yaxis_title='CO2 Emissions (kg)',
-        showlegend=False
-    )
-    
-    st.plotly_chart(fig_sample, use_container_width=True)
+    st.plotly_chart(_sample_figure(), use_container_width=True)
     
     st.info("**Note**: Error bars show the min-max range based on lifestyle factors like diet choice, energy sources, and product origins.")
 
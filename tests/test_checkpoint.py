@@ -0,0 +1,39 @@
+import math
+
+from core.checkpoint import OrjsonSerializer
+from core.state import create_initial_state
+from nodes.aggregator import aggregate_results_node
+from nodes.carbon_estimator import estimate_carbon_node
+from nodes.insights_generator import generate_insights_node
+from nodes.llm_categorizer import llm_categorization_node
+from utils.sample_data import get_sample_categorized_transactions
+
+
+def _final_state():
+    """State after the categorization, estimation, aggregation and insight nodes"""
+    state = create_initial_state()
+    state["rule_categorized"] = get_sample_categorized_transactions()
+    state["uncategorized"] = []
+    for node in (llm_categorization_node, estimate_carbon_node, aggregate_results_node, generate_insights_node):
+        update = node(state)
+        update.pop("messages")
+        state.update(update)
+    return state
+
+
+def test_final_state_round_trips():
+    serde = OrjsonSerializer()
+    state = _final_state()
+    assert state["sorted_categories"]
+
+    for channel, value in state.items():
+        assert serde.loads_typed(serde.dumps_typed(value)) == value, channel
+
+
+def test_non_finite_floats_round_trip():
+    serde = OrjsonSerializer()
+    value = {"nan": float("nan"), "inf": [float("inf")]}
+
+    restored = serde.loads_typed(serde.dumps_typed(value))
+
+    assert math.isnan(restored["nan"]) and restored["inf"] == [float("inf")]
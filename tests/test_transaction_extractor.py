@@ -0,0 +1,33 @@
+from nodes.transaction_extractor import _merge_shard_transactions, _split_into_shards
+
+
+def _extract(text):
+    """Stand-in for the LLM: one transaction per statement line"""
+    transactions = []
+    for line in text.splitlines():
+        date, description, amount = line.split()
+        transactions.append({"date": date, "description": description, "amount": float(amount), "raw_text": line})
+    return transactions
+
+
+def test_identical_transactions_around_shard_boundary_are_kept():
+    payment = "01/10/2025 BBNOW 250.00"
+    lines = [payment, "02/10/2025 ZOMATO 410.00", payment, payment, "03/10/2025 UBER 180.00", payment]
+    raw_text = "\n".join(lines) + "\n"
+
+    shards = _split_into_shards(raw_text, max_chars=100, overlap=50)
+    assert len(shards) > 1
+    transactions = _merge_shard_transactions(shards, [_extract(text) for text, _ in shards])
+
+    assert [txn["raw_text"] for txn in transactions] == lines
+
+
+def test_overlap_lines_are_extracted_once():
+    lines = [f"{day:02d}/10/2025 SHOP{day} {day}00.00" for day in range(1, 21)]
+    raw_text = "\n".join(lines) + "\n"
+
+    shards = _split_into_shards(raw_text, max_chars=120, overlap=60)
+    assert len(shards) > 2
+    transactions = _merge_shard_transactions(shards, [_extract(text) for text, _ in shards])
+
+    assert [txn["raw_text"] for txn in transactions] == lines
@@ -0,0 +1,101 @@
+"""Persistent merchant → category cache for LLM categorization"""
+
+import os
+import re
+import sqlite3
+import threading
+import time
+from typing import Dict, Iterable
+
+# Cache location and how long an LLM-assigned category is trusted
+MERCHANT_CACHE_PATH = os.path.join(".cache", "merchants.sqlite3")
+MERCHANT_CACHE_TTL_DAYS = 30
+_QUERY_BATCH_SIZE = 500
+
+# Payment-rail prefixes, redaction markers and reference numbers vary between
+# transactions of the same merchant, so they are dropped from the cache key
+_PAYMENT_PREFIX_RE = re.compile(r'^(?:upi|neft|imps|rtgs|pos|ach|ecom|nach)\b[\s/-]*')
+_REDACTED_RE = re.compile(r'\[[a-z_]+_redacted\]')
+_NOISE_RE = re.compile(r'[^a-z]+')
+
+def normalize_merchant(description: str) -> str:
+    """
+    Normalize a transaction description into a merchant cache key
+    
+    Args:
+        description: Redacted transaction description
+    
+    Returns:
+        Lowercase merchant string without payment prefixes, references or punctuation
+    """
+    key = _REDACTED_RE.sub(" ", description.lower())
+    key = _PAYMENT_PREFIX_RE.sub("", key.strip())
+    return _NOISE_RE.sub(" ", key).strip()
+
+class MerchantCache:
+    """SQLite-backed store of categories the LLM assigned to merchants in earlier runs"""
+    
+    def __init__(self, path: str = MERCHANT_CACHE_PATH, ttl_days: int = MERCHANT_CACHE_TTL_DAYS):
+        self.path = path
+        self.ttl_seconds = ttl_days * 24 * 3600
+        # Graph nodes may run on worker threads; access is serialized by the lock
+        self._lock = threading.Lock()
+        # The database is opened on first use, so runs that never reach the
+        # LLM categorizer (sample data, cached results) don't pay for it
+        self._conn = None
+    
+    def _connection(self) -> sqlite3.Connection:
+        """Open the database on first use (call with the lock held)"""
+        if self._conn is None:
+            directory = os.path.dirname(self.path)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+            self._conn = sqlite3.connect(self.path, check_same_thread=False)
+            self._conn.execute(
+                "CREATE TABLE IF NOT EXISTS merchant_categories "
+                "(merchant TEXT PRIMARY KEY, category TEXT NOT NULL, updated_at REAL NOT NULL)"
+            )
+        return self._conn
+    
+    def get_many(self, merchants: Iterable[str]) -> Dict[str, str]:
+        """Return cached categories for the given merchant keys (fresh entries only)"""
+        merchants = list({merchant for merchant in merchants if merchant})
+        if not merchants:
+            return {}
+        
+        cutoff = time.time() - self.ttl_seconds
+        categories = {}
+        with self._lock:
+            conn = self._connection()
+            # Stay under SQLite's bound-parameter limit
+            for start in range(0, len(merchants), _QUERY_BATCH_SIZE):
+                batch = merchants[start:start + _QUERY_BATCH_SIZE]
+                placeholders = ",".join("?" * len(batch))
+                rows = conn.execute(
+                    f"SELECT merchant, category FROM merchant_categories "
+                    f"WHERE updated_at >= ? AND merchant IN ({placeholders})",
+                    [cutoff, *batch]
+                )
+                categories.update(rows)
+        return categories
+    
+    def set_many(self, categories: Dict[str, str]) -> None:
+        """Store merchant → category pairs"""
+        now = time.time()
+        rows = [(merchant, category, now) for merchant, category in categories.items() if merchant]
+        if not rows:
+            return
+        
+        with self._lock:
+            conn = self._connection()
+            with conn:
+                conn.executemany(
+                    "INSERT OR REPLACE INTO merchant_categories (merchant, category, updated_at) VALUES (?, ?, ?)",
+                    rows
+                )
+    
+    def close(self) -> None:
+        with self._lock:
+            if self._conn is not None:
+                self._conn.close()
+                self._conn = None
@@ -1,11 +1,21 @@
 """Merchant patterns and emission factors for categorization"""
 
-from typing import Dict, List, Optional
+import re
+import threading
+from bisect import bisect_right
+from itertools import accumulate
+from functools import lru_cache
+from typing import Dict, List, Optional, Tuple
+
+try:
+    import hyperscan  # Optional: faster multi-pattern merchant matching
+except ImportError:
+    hyperscan = None
 
 # Official categories from SpendCategory-EmissionFactorkgCO2e1000.csv
 # These are the ONLY allowed categories - no new ones should be added
 
-OFFICIAL_CATEGORIES = [
+OFFICIAL_CATEGORIES = (
     "food_and_groceries",
     "housing_and_utilities",
     "transport",
@@ -16,7 +26,9 @@ OFFICIAL_CATEGORIES = [
     "recreation_and_leisure",
     "financial_services_and_insurance",
     "miscellaneous"
-]
+)
+# Membership checks without scanning the tuple
+_OFFICIAL_CATEGORY_SET = frozenset(OFFICIAL_CATEGORIES)
 
 # Indian merchant patterns for rule-based categorization
 # Maps to official categories only
@@ -162,121 +174,242 @@ EMISSION_FACTORS = {
     }
 }
 
+# Common category name variations -> official category
+CATEGORY_MAPPINGS = {
+    "food": "food_and_groceries",
+    "groceries": "food_and_groceries",
+    "food_delivery": "food_and_groceries",
+    "food_groceries": "food_and_groceries",
+    "utilities": "housing_and_utilities",
+    "housing": "housing_and_utilities",
+    "housing_utilities": "housing_and_utilities",
+    "housing_rent": "housing_and_utilities",
+    "transport_fuel": "transport",
+    "transport_ride_sharing": "transport",
+    "transport_public": "transport",
+    "fuel": "transport",
+    "clothing": "clothing_and_footwear",
+    "footwear": "clothing_and_footwear",
+    "shopping_clothing": "clothing_and_footwear",
+    "electronics": "household_goods_and_appliances",
+    "appliances": "household_goods_and_appliances",
+    "shopping_online": "household_goods_and_appliances",
+    "shopping_electronics": "household_goods_and_appliances",
+    "healthcare": "healthcare_and_personal_care",
+    "medical": "healthcare_and_personal_care",
+    "personal_care": "healthcare_and_personal_care",
+    "education": "education_and_communication",
+    "communication": "education_and_communication",
+    "entertainment": "recreation_and_leisure",
+    "travel": "recreation_and_leisure",
+    "recreation": "recreation_and_leisure",
+    "recreation_entertainment": "recreation_and_leisure",
+    "recreation_travel": "recreation_and_leisure",
+    "financial": "financial_services_and_insurance",
+    "insurance": "financial_services_and_insurance",
+    "financial_services": "financial_services_and_insurance",
+}
+
+# Human-readable names of the official categories
+CATEGORY_DISPLAY_NAMES = {
+    "food_and_groceries": "Food & Groceries",
+    "housing_and_utilities": "Housing & Utilities",
+    "transport": "Transport",
+    "clothing_and_footwear": "Clothing & Footwear",
+    "household_goods_and_appliances": "Household Goods & Appliances",
+    "healthcare_and_personal_care": "Healthcare & Personal Care",
+    "education_and_communication": "Education & Communication",
+    "recreation_and_leisure": "Recreation & Leisure",
+    "financial_services_and_insurance": "Financial Services & Insurance",
+    "miscellaneous": "Miscellaneous"
+}
+
+# Direct lookup for official names and known variations, so hot loops can
+# skip normalize_category for the common case
+NORMALIZED_CATEGORIES = {
+    **{category: category for category in OFFICIAL_CATEGORIES},
+    **CATEGORY_MAPPINGS
+}
+
+def _rank_merchant_patterns():
+    """
+    Flatten the merchant patterns into (pattern, category) pairs, most specific first
+    
+    Longer patterns rank first so e.g. "amazon prime" beats "amazon" and
+    "gas station" beats "gas"; equal lengths keep INDIAN_MERCHANT_PATTERNS order.
+    A description gets the category of its best-ranked (lowest index) match.
+    """
+    flat = [
+        (pattern.lower(), category)
+        for category, patterns in INDIAN_MERCHANT_PATTERNS.items()
+        for pattern in patterns
+    ]
+    # sorted() is stable, so equal lengths stay in declaration order
+    return sorted(flat, key=lambda item: -len(item[0]))
+
+def _build_merchant_matcher():
+    """
+    Compile all merchant patterns into one regex
+    
+    The alternation sits in a lookahead, so finditer reports a match at every
+    position (overlapping ones included), longest pattern first at each position.
+    Patterns are bucketed by first character, so each position only tries the
+    patterns that can start there instead of the whole list.
+    Returns the regex and each pattern's best rank.
+    """
+    ranks = {}
+    buckets = {}
+    for rank, (pattern, _) in enumerate(_RANKED_PATTERNS):
+        if pattern not in ranks:
+            ranks[pattern] = rank
+            buckets.setdefault(pattern[0], []).append(re.escape(pattern[1:]))
+    alternation = "|".join(
+        f"{re.escape(first)}(?:{'|'.join(rests)})" for first, rests in buckets.items()
+    )
+    return re.compile(f"(?=({alternation}))"), ranks
+
+def _match_merchant(description_lower: str) -> Optional[str]:
+    """Category of the best-ranked pattern in a lowercased description (regex fallback)"""
+    best_rank = min(
+        (_MERCHANT_RANKS[match.group(1)] for match in _MERCHANT_RE.finditer(description_lower)),
+        default=None
+    )
+    return None if best_rank is None else _RANKED_PATTERNS[best_rank][1]
+
+def _build_merchant_database():
+    """Compile all merchant patterns into a Hyperscan database (ids are pattern ranks)"""
+    database = hyperscan.Database()
+    database.compile(
+        expressions=[re.escape(pattern).encode() for pattern, _ in _RANKED_PATTERNS],
+        ids=list(range(len(_RANKED_PATTERNS))),
+        elements=len(_RANKED_PATTERNS)
+    )
+    return database
+
+def _collect_match(pattern_id, start, end, flags, matched):
+    matched.append((end, pattern_id))
+
+def _get_scratch():
+    # Scratch space can't be shared between concurrent scans
+    scratch = getattr(_scan_local, "scratch", None)
+    if scratch is None:
+        scratch = _scan_local.scratch = hyperscan.Scratch(_MERCHANT_DB)
+    return scratch
+
+def _scan_merchants(descriptions_lower: List[str]) -> List[Optional[str]]:
+    """Scan lowercased descriptions with one Hyperscan pass; the best-ranked pattern wins"""
+    encoded = [description.encode() for description in descriptions_lower]
+    # Start offset of every description inside the joined blob
+    starts = list(accumulate((len(data) + 1 for data in encoded), initial=0))
+    
+    matched = []
+    _MERCHANT_DB.scan(
+        _SEPARATOR.join(encoded),
+        match_event_handler=_collect_match,
+        context=matched,
+        scratch=_get_scratch()
+    )
+    
+    best_ids = [None] * len(encoded)
+    for end, pattern_id in matched:
+        row = bisect_right(starts, end - 1) - 1
+        if best_ids[row] is None or pattern_id < best_ids[row]:
+            best_ids[row] = pattern_id
+    return [None if i is None else _RANKED_PATTERNS[i][1] for i in best_ids]
+
+_RANKED_PATTERNS = _rank_merchant_patterns()
+_MERCHANT_RE, _MERCHANT_RANKS = _build_merchant_matcher()
+_MERCHANT_DB = _build_merchant_database() if hyperscan else None
+_scan_local = threading.local()
+# Joins descriptions for the batched scan; no merchant pattern contains it
+_SEPARATOR = b"\x1e"
+
+def categorize_transactions(descriptions: List[str]) -> List[Optional[str]]:
+    """
+    Categorize many transactions based on merchant patterns in one batch
+    
+    Args:
+        descriptions: Transaction descriptions
+    
+    Returns:
+        Category name (or None) for each description, in the same order
+    """
+    descriptions_lower = [description.lower() for description in descriptions]
+    # Repeated descriptions (same merchant, identical redacted references) are matched once
+    unique_descriptions = list(dict.fromkeys(descriptions_lower))
+    
+    if _MERCHANT_DB is not None:
+        categories = _scan_merchants(unique_descriptions)
+    else:
+        categories = [_match_merchant(description) for description in unique_descriptions]
+    
+    if len(unique_descriptions) == len(descriptions_lower):
+        return categories
+    category_by_description = dict(zip(unique_descriptions, categories))
+    return [category_by_description[description] for description in descriptions_lower]
+
 def categorize_transaction(description: str) -> Optional[str]:
     """
     Categorize transaction based on merchant patterns
     
     Args:
         description: Transaction description
-        
+    
     Returns:
         Category name if matched, None otherwise
     """
-    description_lower = description.lower()
-    
-    for category, patterns in INDIAN_MERCHANT_PATTERNS.items():
-        for pattern in patterns:
-            if pattern.lower() in description_lower:
-                return category
-    
-    return None
+    return categorize_transactions([description])[0]
 
+@lru_cache(maxsize=128)
 def get_emission_factor(category: str) -> Dict[str, float]:
     """
     Get emission factor for a category
     
     Args:
         category: Category name
-        
+    
     Returns:
         Dict with min, max emission factors
     """
     return EMISSION_FACTORS.get(category, EMISSION_FACTORS["miscellaneous"])
 
-def get_all_categories() -> List[str]:
-    """Get list of all official categories"""
-    return OFFICIAL_CATEGORIES.copy()
+def get_all_categories() -> Tuple[str, ...]:
+    """Get all official categories (an immutable tuple, shared between callers)"""
+    return OFFICIAL_CATEGORIES
 
 def is_valid_category(category: str) -> bool:
     """Check if a category is in the official list"""
-    return category in OFFICIAL_CATEGORIES
+    return category in _OFFICIAL_CATEGORY_SET
 
+@lru_cache(maxsize=128)
 def normalize_category(category: str) -> str:
     """
     Normalize category name to official category
     Returns 'miscellaneous' if not found
     """
-    if category in OFFICIAL_CATEGORIES:
+    if category in _OFFICIAL_CATEGORY_SET:
         return category
     
     # Try to map common variations
     category_lower = category.lower().replace(" ", "_").replace("-", "_")
     
-    # Common mappings
-    mappings = {
-        "food": "food_and_groceries",
-        "groceries": "food_and_groceries",
-        "food_delivery": "food_and_groceries",
-        "food_groceries": "food_and_groceries",
-        "utilities": "housing_and_utilities",
-        "housing": "housing_and_utilities",
-        "housing_utilities": "housing_and_utilities",
-        "housing_rent": "housing_and_utilities",
-        "transport_fuel": "transport",
-        "transport_ride_sharing": "transport",
-        "transport_public": "transport",
-        "fuel": "transport",
-        "clothing": "clothing_and_footwear",
-        "footwear": "clothing_and_footwear",
-        "shopping_clothing": "clothing_and_footwear",
-        "electronics": "household_goods_and_appliances",
-        "appliances": "household_goods_and_appliances",
-        "shopping_online": "household_goods_and_appliances",
-        "shopping_electronics": "household_goods_and_appliances",
-        "healthcare": "healthcare_and_personal_care",
-        "medical": "healthcare_and_personal_care",
-        "personal_care": "healthcare_and_personal_care",
-        "education": "education_and_communication",
-        "communication": "education_and_communication",
-        "entertainment": "recreation_and_leisure",
-        "travel": "recreation_and_leisure",
-        "recreation": "recreation_and_leisure",
-        "recreation_entertainment": "recreation_and_leisure",
-        "recreation_travel": "recreation_and_leisure",
-        "financial": "financial_services_and_insurance",
-        "insurance": "financial_services_and_insurance",
-        "financial_services": "financial_services_and_insurance",
-    }
-    
-    if category_lower in mappings:
-        return mappings[category_lower]
+    if category_lower in CATEGORY_MAPPINGS:
+        return CATEGORY_MAPPINGS[category_lower]
     
     return "miscellaneous"
 
+@lru_cache(maxsize=128)
 def get_category_display_name(category: str) -> str:
     """
     Get human-readable display name for category
     
     Args:
         category: Category name
-        
+    
     Returns:
         Display name
     """
-    display_names = {
-        "food_and_groceries": "Food & Groceries",
-        "housing_and_utilities": "Housing & Utilities",
-        "transport": "Transport",
-        "clothing_and_footwear": "Clothing & Footwear",
-        "household_goods_and_appliances": "Household Goods & Appliances",
-        "healthcare_and_personal_care": "Healthcare & Personal Care",
-        "education_and_communication": "Education & Communication",
-        "recreation_and_leisure": "Recreation & Leisure",
-        "financial_services_and_insurance": "Financial Services & Insurance",
-        "miscellaneous": "Miscellaneous"
-    }
-    
-    return display_names.get(category, category.replace("_", " ").title())
+    return CATEGORY_DISPLAY_NAMES.get(category, category.replace("_", " ").title())
 
 def get_category_stats() -> Dict[str, int]:
     """Get statistics about merchant patterns"""
@@ -1,112 +1,124 @@
 """Report generation utilities"""
 
+import csv
+import io
 import json
 from datetime import datetime
-from typing import Dict, Any, List
+from typing import Dict, Any, List, Optional
 
-def generate_report(result: Dict[str, Any]) -> str:
-    """
-    Generate a comprehensive text report from analysis results
-    """
-    report = []
+def _category_avg(item) -> float:
+    """Sort key for (category, totals) pairs: average emissions"""
+    return item[1].get("avg", 0)
+
+def _report_lines(result: Dict[str, Any], now: datetime):
+    """Yield the lines of the text report, section by section"""
     
     # Header
-    report.append("=" * 70)
-    report.append("🌱 CARBON FOOTPRINT ANALYSIS REPORT")
-    report.append("=" * 70)
-    report.append(f"Generated: {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}")
-    report.append("")
+    yield "=" * 70
+    yield "🌱 CARBON FOOTPRINT ANALYSIS REPORT"
+    yield "=" * 70
+    yield f"Generated: {now.strftime('%Y-%m-%d %H:%M:%S')}"
+    yield ""
     
     # Summary
     total_min = result.get("total_carbon_kg_min", 0)
     total_max = result.get("total_carbon_kg_max", 0)
     total_avg = result.get("total_carbon_kg_avg", 0)
     
-    report.append("📊 CARBON FOOTPRINT SUMMARY")
-    report.append("-" * 30)
-    report.append(f"Total Emissions (Min): {total_min:.2f} kg CO2e")
-    report.append(f"Total Emissions (Max): {total_max:.2f} kg CO2e")
-    report.append(f"Total Emissions (Avg): {total_avg:.2f} kg CO2e")
-    report.append("")
+    yield "📊 CARBON FOOTPRINT SUMMARY"
+    yield "-" * 30
+    yield f"Total Emissions (Min): {total_min:.2f} kg CO2e"
+    yield f"Total Emissions (Max): {total_max:.2f} kg CO2e"
+    yield f"Total Emissions (Avg): {total_avg:.2f} kg CO2e"
+    yield ""
     
     # Processing stats
     rule_count = result.get("rule_based_count", 0)
     llm_count = result.get("llm_based_count", 0)
     total_txns = rule_count + llm_count
+    # A run with no debits has nothing to split
+    rule_pct = rule_count / total_txns * 100 if total_txns else 0.0
+    llm_pct = llm_count / total_txns * 100 if total_txns else 0.0
     
-    report.append("⚙️ PROCESSING EFFICIENCY")
-    report.append("-" * 25)
-    report.append(f"Total Transactions: {total_txns}")
-    report.append(f"Rule-based Categorization: {rule_count} ({(rule_count/total_txns*100):.1f}%)")
-    report.append(f"LLM-based Categorization: {llm_count} ({(llm_count/total_txns*100):.1f}%)")
-    report.append("")
+    yield "⚙️ PROCESSING EFFICIENCY"
+    yield "-" * 25
+    yield f"Total Transactions: {total_txns}"
+    yield f"Rule-based Categorization: {rule_count} ({rule_pct:.1f}%)"
+    yield f"LLM-based Categorization: {llm_count} ({llm_pct:.1f}%)"
+    yield ""
     
     # Category breakdown
     category_breakdown = result.get("category_breakdown", {})
     if category_breakdown:
-        report.append("🏷️ CATEGORY BREAKDOWN")
-        report.append("-" * 20)
+        yield "🏷️ CATEGORY BREAKDOWN"
+        yield "-" * 20
         
-        # Sort by emissions
-        sorted_categories = sorted(
-            category_breakdown.items(),
-            key=lambda x: x[1].get("avg", 0),
-            reverse=True
+        # Highest emissions first; pipeline results carry the aggregator's ranking
+        sorted_categories = result.get("sorted_categories") or sorted(
+            category_breakdown.items(), key=_category_avg, reverse=True
         )
         
+        # Share of the total is 0% for every category when the total is 0
+        percent_scale = 100 / total_avg if total_avg > 0 else 0
         for category, data in sorted_categories:
             avg_emissions = data.get("avg", 0)
             count = data.get("count", 0)
             amount = data.get("amount_spent", 0)
-            percentage = (avg_emissions / total_avg * 100) if total_avg > 0 else 0
+            percentage = avg_emissions * percent_scale
             
             display_name = data.get("display_name", category.replace("_", " ").title())
-            report.append(f"{display_name}:")
-            report.append(f"  Emissions: {avg_emissions:.2f} kg CO2e ({percentage:.1f}%)")
-            report.append(f"  Transactions: {count}")
-            report.append(f"  Amount Spent: ₹{amount:,.0f}")
-            report.append("")
+            yield f"{display_name}:"
+            yield f"  Emissions: {avg_emissions:.2f} kg CO2e ({percentage:.1f}%)"
+            yield f"  Transactions: {count}"
+            yield f"  Amount Spent: ₹{amount:,.0f}"
+            yield ""
     
     # Insights
     insights = result.get("insights", [])
     if insights:
-        report.append("💡 KEY INSIGHTS")
-        report.append("-" * 15)
+        yield "💡 KEY INSIGHTS"
+        yield "-" * 15
         for insight in insights:
-            report.append(f"• {insight}")
-        report.append("")
+            yield f"• {insight}"
+        yield ""
     
     # Recommendations
     recommendations = result.get("recommendations", [])
     if recommendations:
-        report.append("🎯 RECOMMENDATIONS")
-        report.append("-" * 18)
+        yield "🎯 RECOMMENDATIONS"
+        yield "-" * 18
         for i, rec in enumerate(recommendations, 1):
-            report.append(f"{i}. {rec}")
-        report.append("")
+            yield f"{i}. {rec}"
+        yield ""
     
     # Monthly breakdown if available
     monthly_breakdown = result.get("monthly_breakdown", {})
     if monthly_breakdown:
-        report.append("📅 MONTHLY BREAKDOWN")
-        report.append("-" * 20)
+        yield "📅 MONTHLY BREAKDOWN"
+        yield "-" * 20
         for month, data in monthly_breakdown.items():
-            report.append(f"{month}: {data.get('total_carbon', 0):.2f} kg CO2e")
-        report.append("")
+            yield f"{month}: {data.get('total_carbon', 0):.2f} kg CO2e"
+        yield ""
     
     # Footer
-    report.append("=" * 70)
-    report.append("Privacy: PII redacted per DPDP Act 2023 | Powered by LangGraph")
-    report.append("=" * 70)
-    
-    return "\n".join(report)
+    yield "=" * 70
+    yield "Privacy: PII redacted per DPDP Act 2023 | Powered by LangGraph"
+    yield "=" * 70
 
-def generate_json_report(result: Dict[str, Any]) -> str:
+def generate_report(result: Dict[str, Any], now: Optional[datetime] = None) -> str:
+    """
+    Generate a comprehensive text report from analysis results
+    Pass now to stamp several reports of one export with the same time
+    """
+    return "\n".join(_report_lines(result, now or datetime.now()))
+
+def generate_json_report(result: Dict[str, Any], now: Optional[datetime] = None) -> str:
     """
     Generate JSON report for download
+    Pass now to stamp several reports of one export with the same time
     """
     json_result = {
-        "timestamp": datetime.now().isoformat(),
+        "timestamp": (now or datetime.now()).isoformat(),
         "total_carbon_kg_min": result.get("total_carbon_kg_min", 0),
         "total_carbon_kg_max": result.get("total_carbon_kg_max", 0),
         "total_carbon_kg_avg": result.get("total_carbon_kg_avg", 0),
@@ -126,23 +138,26 @@ def generate_csv_data(result: Dict[str, Any]) -> str:
     """
     Generate CSV data for transaction-level export
     """
-    csv_lines = []
+    buffer = io.StringIO()
+    writer = csv.writer(buffer, lineterminator="\n")
     
     # Header
-    csv_lines.append("Date,Description,Amount,Category,Carbon_Min,Carbon_Max,Carbon_Avg,Method")
+    writer.writerow(["Date", "Description", "Amount", "Category", "Carbon_Min", "Carbon_Max", "Carbon_Avg", "Method"])
     
-    # Transaction data
+    # Transaction data (descriptions with commas or quotes are quoted by the writer)
     carbon_estimates = result.get("carbon_estimates", [])
-    for estimate in carbon_estimates:
-        date = estimate.get("date", "")
-        description = estimate.get("description", "").replace(",", ";")  # Escape commas
-        amount = estimate.get("amount", 0)
-        category = estimate.get("category", "")
-        carbon_min = estimate.get("carbon_kg_min", 0)
-        carbon_max = estimate.get("carbon_kg_max", 0)
-        carbon_avg = estimate.get("carbon_kg_avg", 0)
-        method = estimate.get("categorization_method", "")
-        
-        csv_lines.append(f"{date},{description},{amount},{category},{carbon_min},{carbon_max},{carbon_avg},{method}")
+    writer.writerows(
+        [
+            estimate.get("date", ""),
+            estimate.get("description", ""),
+            estimate.get("amount", 0),
+            estimate.get("category", ""),
+            estimate.get("carbon_kg_min", 0),
+            estimate.get("carbon_kg_max", 0),
+            estimate.get("carbon_kg_avg", 0),
+            estimate.get("categorization_method", "")
+        ]
+        for estimate in carbon_estimates
+    )
     
-    return "\n".join(csv_lines)
\ No newline at end of file
+    return buffer.getvalue()
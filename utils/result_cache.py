@@ -0,0 +1,119 @@
+"""On-disk cache of finished analyses, keyed by statement content"""
+
+import hashlib
+import json
+import logging
+import os
+import tempfile
+import time
+from typing import Optional
+from utils.patterns import CATEGORY_MAPPINGS, EMISSION_FACTORS, INDIAN_MERCHANT_PATTERNS
+
+# Cache location and how long a finished analysis is reused
+RESULT_CACHE_DIR = os.path.join(".cache", "results")
+RESULT_CACHE_TTL_SECONDS = 24 * 60 * 60
+
+# Bump when a pipeline change alters results for the same statement; pattern,
+# mapping and emission factor edits are picked up by the rules fingerprint below
+RESULT_CACHE_VERSION = 1
+
+# Output fields kept for a cached run (messages, inputs and the unredacted
+# extracted transactions are not stored)
+RESULT_FIELDS = (
+    "bank_type", "extraction_method", "carbon_estimates",
+    "total_carbon_kg_min", "total_carbon_kg_max", "total_carbon_kg_avg",
+    "category_breakdown", "monthly_breakdown", "sorted_categories",
+    "rule_based_count", "llm_based_count", "merchant_cache_hits", "pii_redacted_count",
+    "credits_filtered_count", "debits_processed_count",
+    "high_value_transactions", "high_value_count",
+    "processing_summary", "recommendations", "insights", "processing_status"
+)
+
+# Per-row fields holding original statement text (PII) that are dropped before storing
+_UNREDACTED_FIELDS = ("original_description", "raw_text", "full_transaction")
+
+_READ_CHUNK_SIZE = 1 << 20
+
+logger = logging.getLogger(__name__)
+
+def _rules_fingerprint() -> bytes:
+    """Digest of the categorization rules and emission factors the results depend on"""
+    rules = json.dumps(
+        [RESULT_CACHE_VERSION, INDIAN_MERCHANT_PATTERNS, CATEGORY_MAPPINGS, EMISSION_FACTORS],
+        sort_keys=True
+    )
+    return hashlib.blake2b(rules.encode(), digest_size=16).digest()
+
+_RULES_FINGERPRINT = _rules_fingerprint()
+
+def result_cache_key(pdf_path: str, password: str, llm_provider: str, llm_model: str,
+                     pdf_bytes: bytes = b"") -> str:
+    """
+    Hash a statement file together with everything else that changes its analysis
+    
+    Args:
+        pdf_path: Path to PDF bank statement
+        password: PDF password (part of the key so a cached result needs the same password)
+        llm_provider: LLM provider used for categorization
+        llm_model: LLM model used for categorization
+        pdf_bytes: Statement content, hashed instead of reading pdf_path (optional)
+    
+    Returns:
+        Hex digest identifying the cached result
+    """
+    digest = hashlib.blake2b(_RULES_FINGERPRINT, digest_size=32)
+    if pdf_bytes:
+        digest.update(pdf_bytes)
+    else:
+        with open(pdf_path, "rb") as f:
+            for chunk in iter(lambda: f.read(_READ_CHUNK_SIZE), b""):
+                digest.update(chunk)
+    for part in (password, llm_provider, llm_model):
+        digest.update(b"\0" + (part or "").encode())
+    return digest.hexdigest()
+
+def _result_path(key: str) -> str:
+    return os.path.join(RESULT_CACHE_DIR, f"{key}.json")
+
+def load_cached_result(key: str) -> Optional[dict]:
+    """Return the cached result fields, or None if there is no usable (unexpired) cache entry"""
+    path = _result_path(key)
+    try:
+        if time.time() - os.path.getmtime(path) > RESULT_CACHE_TTL_SECONDS:
+            os.remove(path)
+            return None
+        with open(path, "r", encoding="utf-8") as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+
+def is_cacheable_result(result: dict) -> bool:
+    """Whether a finished run may be reused; runs with errors (PDF or LLM fallbacks) are not"""
+    return not result.get("errors")
+
+def _redacted_rows(rows: list) -> list:
+    """Copies of per-transaction rows without their original statement text"""
+    return [
+        {field: value for field, value in row.items() if field not in _UNREDACTED_FIELDS}
+        for row in rows
+    ]
+
+def store_cached_result(key: str, state: dict) -> None:
+    """Write the result fields of a finished run atomically"""
+    result = {field: state[field] for field in RESULT_FIELDS if field in state}
+    for field in ("carbon_estimates", "high_value_transactions"):
+        if field in result:
+            result[field] = _redacted_rows(result[field])
+    path = _result_path(key)
+    try:
+        os.makedirs(RESULT_CACHE_DIR, exist_ok=True)
+        fd, tmp_path = tempfile.mkstemp(dir=RESULT_CACHE_DIR, suffix=".tmp")
+        try:
+            with os.fdopen(fd, "w", encoding="utf-8") as f:
+                json.dump(result, f)
+            os.replace(tmp_path, path)
+        except BaseException:
+            os.remove(tmp_path)
+            raise
+    except (OSError, TypeError, ValueError) as e:
+        logger.warning("Could not cache analysis result: %s", e)
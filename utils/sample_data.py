@@ -3,6 +3,35 @@
 from typing import List, Dict, Any
 from datetime import datetime, timedelta
 import random
+import re
+import numpy as np
+
+# Sample PII patterns fused into one alternation; the group name selects the replacement.
+# Mobile numbers are tried before the more general 8+ digit account pattern.
+_PII_RE = re.compile(
+    r'(?P<mobile>\b\d{10}\b)'
+    r'|(?P<upi>\b[A-Za-z0-9._%+-]+@[A-Za-z0-9.-]+\b)'
+    r'|(?P<account>\b\d{8,}\b)'
+)
+_PII_REPLACEMENTS = {
+    "mobile": "[MOBILE_REDACTED]",
+    "upi": "[UPI_ID_REDACTED]",
+    "account": "[ACCOUNT_REDACTED]"
+}
+
+# Emission factors of the sample categories (kg CO2e per ₹1000)
+_SAMPLE_EMISSION_FACTORS = {
+    "food_delivery": {"min": 8, "max": 15},
+    "transport_ride_sharing": {"min": 25, "max": 40},
+    "housing_utilities": {"min": 12, "max": 20},
+    "food_groceries": {"min": 6, "max": 12},
+    "transport_fuel": {"min": 30, "max": 45},
+    "shopping_online": {"min": 5, "max": 10},
+    "recreation_entertainment": {"min": 3, "max": 8},
+    "shopping_clothing": {"min": 8, "max": 15},
+    "miscellaneous": {"min": 5, "max": 10}
+}
+_DEFAULT_SAMPLE_FACTOR = {"min": 5, "max": 10}
 
 def get_sample_statement_text() -> str:
     """Get sample bank statement text for testing"""
@@ -151,19 +180,8 @@ def get_sample_redacted_transactions() -> List[Dict[str, Any]]:
     return redacted
 
 def redact_description(description: str) -> str:
-    """Redact PII from transaction description"""
-    import re
-    
-    # Redact mobile numbers (10 digits)
-    description = re.sub(r'\b\d{10}\b', '[MOBILE_REDACTED]', description)
-    
-    # Redact UPI IDs (email-like patterns)
-    description = re.sub(r'\b[A-Za-z0-9._%+-]+@[A-Za-z0-9.-]+\b', '[UPI_ID_REDACTED]', description)
-    
-    # Redact account numbers (longer digit sequences)
-    description = re.sub(r'\b\d{8,}\b', '[ACCOUNT_REDACTED]', description)
-    
-    return description
+    """Redact PII (mobile numbers, UPI IDs, account numbers) from a transaction description in one pass"""
+    return _PII_RE.sub(lambda match: _PII_REPLACEMENTS[match.lastgroup], description)
 
 def get_sample_categorized_transactions() -> List[Dict[str, Any]]:
     """Get sample categorized transactions"""
@@ -205,60 +223,53 @@ def get_sample_carbon_estimates() -> List[Dict[str, Any]]:
     """Get sample carbon estimates"""
     categorized = get_sample_categorized_transactions()
     
-    # Emission factors (kg CO2e per ₹1000)
-    emission_factors = {
-        "food_delivery": {"min": 8, "max": 15},
-        "transport_ride_sharing": {"min": 25, "max": 40},
-        "housing_utilities": {"min": 12, "max": 20},
-        "food_groceries": {"min": 6, "max": 12},
-        "transport_fuel": {"min": 30, "max": 45},
-        "shopping_online": {"min": 5, "max": 10},
-        "recreation_entertainment": {"min": 3, "max": 8},
-        "shopping_clothing": {"min": 8, "max": 15},
-        "miscellaneous": {"min": 5, "max": 10}
-    }
+    # Per-row factors, then the arithmetic for all rows at once (amount in thousands of rupees)
+    factors = [_SAMPLE_EMISSION_FACTORS.get(txn["category"], _DEFAULT_SAMPLE_FACTOR) for txn in categorized]
+    amount_thousands = np.array([txn["amount"] for txn in categorized], dtype=np.float64) / 1000
+    carbon_min = amount_thousands * np.array([f["min"] for f in factors], dtype=np.float64)
+    carbon_max = amount_thousands * np.array([f["max"] for f in factors], dtype=np.float64)
+    carbon_avg = (carbon_min + carbon_max) / 2
     
-    estimates = []
-    for txn in categorized:
-        factor = emission_factors.get(txn["category"], {"min": 5, "max": 10})
-        amount_thousands = txn["amount"] / 1000
-        
-        carbon_min = amount_thousands * factor["min"]
-        carbon_max = amount_thousands * factor["max"]
-        carbon_avg = (carbon_min + carbon_max) / 2
-        
-        estimates.append({
+    # Rounded in Python: np.round can differ on values like 5.175
+    rows = zip(categorized, factors, carbon_min.tolist(), carbon_max.tolist(), carbon_avg.tolist())
+    return [
+        {
             **txn,
-            "carbon_kg_min": round(carbon_min, 2),
-            "carbon_kg_max": round(carbon_max, 2),
-            "carbon_kg_avg": round(carbon_avg, 2),
+            "carbon_kg_min": round(kg_min, 2),
+            "carbon_kg_max": round(kg_max, 2),
+            "carbon_kg_avg": round(kg_avg, 2),
             "emission_factor_min": factor["min"],
             "emission_factor_max": factor["max"]
-        })
-    
-    return estimates
+        }
+        for txn, factor, kg_min, kg_max, kg_avg in rows
+    ]
 
 def get_sample_analysis_result() -> Dict[str, Any]:
     """Get complete sample analysis result"""
     carbon_estimates = get_sample_carbon_estimates()
     
-    # Calculate totals
-    total_min = sum(est["carbon_kg_min"] for est in carbon_estimates)
-    total_max = sum(est["carbon_kg_max"] for est in carbon_estimates)
-    total_avg = sum(est["carbon_kg_avg"] for est in carbon_estimates)
-    
-    # Category breakdown
-    category_totals = {}
-    for est in carbon_estimates:
-        cat = est["category"]
-        if cat not in category_totals:
-            category_totals[cat] = {"min": 0, "max": 0, "avg": 0, "count": 0}
-        category_totals[cat]["min"] += est["carbon_kg_min"]
-        category_totals[cat]["max"] += est["carbon_kg_max"] 
-        category_totals[cat]["avg"] += est["carbon_kg_avg"]
-        category_totals[cat]["count"] += 1
+    # Per-category totals are grouped sums over the estimate columns
+    category_index = {}
+    category_ids = np.array(
+        [category_index.setdefault(est["category"], len(category_index)) for est in carbon_estimates],
+        dtype=np.intp
+    )
+    n_categories = len(category_index)
+    columns = {
+        key: np.array([est[f"carbon_kg_{key}"] for est in carbon_estimates], dtype=np.float64)
+        for key in ("min", "max", "avg")
+    }
+    sums = {
+        key: np.bincount(category_ids, weights=values, minlength=n_categories).tolist()
+        for key, values in columns.items()
+    }
+    counts = np.bincount(category_ids, minlength=n_categories).tolist()
+    category_totals = {
+        category: {"min": sums["min"][i], "max": sums["max"][i], "avg": sums["avg"][i], "count": counts[i]}
+        for category, i in category_index.items()
+    }
+    total_min, total_max, total_avg = (float(columns[key].sum()) for key in ("min", "max", "avg"))
     
-    # Efficiency stats
     rule_based_count = sum(1 for est in carbon_estimates if est["categorization_method"] == "rule_based")
     llm_based_count = len(carbon_estimates) - rule_based_count
     